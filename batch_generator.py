@@ -0,0 +1,142 @@
+import os
+import io
+import csv
+import threading
+import time
+
+from app import db
+from models import GeneratedDocument
+from openai_service import generate_letter_content
+from catalog import catalog
+from rate_limit import RateLimitExceeded
+from template_engine import is_demo_content
+from stats_service import stats_aggregator
+
+BATCH_FIELDS = [
+    'document_type', 'category', 'language', 'tone', 'sender_name', 'recipient_name',
+    'purpose', 'reason', 'date_range', 'additional_details'
+]
+REQUIRED_FIELDS = ['document_type', 'sender_name', 'recipient_name', 'purpose']
+
+BATCH_MAX_ROWS = int(os.environ.get("BATCH_MAX_ROWS", "500"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))
+BATCH_REQUESTS_PER_MINUTE = int(os.environ.get("BATCH_REQUESTS_PER_MINUTE", "60"))
+
+
+class BatchValidationError(Exception):
+    """Raised when a batch payload cannot be turned into generation rows"""
+
+
+class RequestPacer:
+    """
+    Spaces out calls to stay under a requests-per-minute budget, and widens the spacing after a 429
+    """
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def back_off(self, seconds):
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+def _is_rate_limited(error):
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message or "rate_limit" in message
+
+
+def parse_batch_rows(payload=None, csv_file=None, defaults=None):
+    """
+    Normalize a JSON list or an uploaded CSV into generation rows, applying shared defaults
+    """
+    if csv_file is not None:
+        text = io.TextIOWrapper(csv_file, encoding='utf-8-sig', newline='')
+        raw_rows = list(csv.DictReader(text))
+    elif isinstance(payload, dict):
+        defaults = {**payload.get('defaults', {}), **(defaults or {})}
+        raw_rows = payload.get('rows', [])
+    else:
+        raw_rows = payload or []
+
+    if not isinstance(raw_rows, list) or not raw_rows:
+        raise BatchValidationError("Batch must contain at least one row.")
+    if len(raw_rows) > BATCH_MAX_ROWS:
+        raise BatchValidationError(f"Batch is limited to {BATCH_MAX_ROWS} rows.")
+
+    rows = []
+    for index, raw in enumerate(raw_rows, start=1):
+        if not isinstance(raw, dict):
+            raise BatchValidationError(f"Row {index} is not an object.")
+        row = {field: (defaults or {}).get(field) for field in BATCH_FIELDS}
+        for field in BATCH_FIELDS:
+            value = raw.get(field)
+            if isinstance(value, str):
+                value = value.strip()
+            if value:
+                row[field] = value
+
+        missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+        if missing:
+            raise BatchValidationError(f"Row {index} is missing: {', '.join(missing)}.")
+
+        row['language'] = row['language'] or 'english'
+        row['tone'] = row['tone'] or 'formal'
+        row['category'] = row['category'] or catalog.category_of(row['document_type'])
+        rows.append(row)
+    return rows
+
+
+batch_pacer = RequestPacer(BATCH_REQUESTS_PER_MINUTE)
+
+
+def batch_job_params(rows, session_id=None):
+    """Job parameters for each row of a queued batch, numbered from 1 for error reports"""
+    return [{**row, 'row': index, 'session_id': session_id} for index, row in enumerate(rows, start=1)]
+
+
+def batch_row_kwargs(params):
+    """Generator arguments for one queued batch row"""
+    return {field: params[field] for field in BATCH_FIELDS if field != 'category'}
+
+
+def generate_batch_row(timeout=None, **kwargs):
+    """Generate one queued batch row, paced to BATCH_REQUESTS_PER_MINUTE across every batch worker"""
+    batch_pacer.wait()
+    try:
+        return generate_letter_content(timeout=timeout, **kwargs)
+    except RateLimitExceeded as e:
+        # The provider quota is spent: hold every batch worker until it refills, then the job queue retries
+        batch_pacer.back_off(e.retry_after)
+        raise
+    except Exception as e:
+        if _is_rate_limited(e):
+            batch_pacer.back_off(60.0 / max(1, BATCH_REQUESTS_PER_MINUTE) * BATCH_CONCURRENCY)
+        raise
+
+
+def save_batch_row(params, content):
+    """Persist the document of one queued batch row"""
+    document = GeneratedDocument(
+        **{field: params[field] for field in BATCH_FIELDS},
+        generated_content=content,
+        session_id=params.get('session_id'),
+        is_demo=is_demo_content(content)
+    )
+    try:
+        db.session.add(document)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    stats_aggregator.record(document.document_type, document.category, document.language)
+    return document
@@ -0,0 +1,75 @@
+"""
+Benchmark PDF render time and output size per language against the documented budget.
+
+Hindi and Marathi only count when they render with the Devanagari profile and HarfBuzz shaping;
+otherwise they are reported as failures, since the app refuses to render them (see fonts/README.md).
+
+Usage: python benchmarks/pdf_render.py [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_generator import (generate_pdf, get_layout_profile, shaping_available, unavailable_languages,
+                           REQUIRED_PROFILES, PDF_SIZE_BUDGET_BYTES, PDF_RENDER_BUDGET_MS)
+from template_engine import render_letter
+
+SAMPLES = {
+    'english': ('Asha Patil', 'The Principal', 'Medical leave', 'Fever and doctor-advised rest'),
+    'hindi': ('आशा पाटिल', 'प्राचार्य महोदय', 'चिकित्सा अवकाश', 'बुखार और डॉक्टर की सलाह पर आराम'),
+    'marathi': ('आशा पाटील', 'मुख्याध्यापक', 'वैद्यकीय रजा', 'ताप आणि डॉक्टरांच्या सल्ल्यानुसार विश्रांती')
+}
+
+
+def benchmark(language, iterations):
+    sender_name, recipient_name, purpose, reason = SAMPLES[language]
+    letter_data = {
+        'content': render_letter('Leave Application', language, 'formal', sender_name, recipient_name,
+                                 purpose, reason, '2025-07-01 to 2025-07-05'),
+        'document_type': 'Leave Application',
+        'language': language
+    }
+
+    # Warm-up render so one-time font parsing is not counted
+    size = len(generate_pdf(letter_data).getvalue())
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        generate_pdf(letter_data)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'profile': get_layout_profile(language=language).name,
+        'bytes': size,
+        'mean_ms': sum(timings) / len(timings),
+        'p95_ms': timings[int(len(timings) * 0.95) - 1]
+    }
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    within_budget = True
+    print(f"{'language':<10}{'profile':<16}{'bytes':>8}{'mean ms':>10}{'p95 ms':>10}")
+    for language in SAMPLES:
+        required = REQUIRED_PROFILES.get(language)
+        if language in unavailable_languages():
+            within_budget = False
+            print(f"{language:<10}{'-':<16}{'-':>8}{'-':>10}{'-':>10}  FAILED: {required} profile not registered (font missing)")
+            continue
+        if required and not shaping_available():
+            within_budget = False
+            print(f"{language:<10}{required:<16}{'-':>8}{'-':>10}{'-':>10}  FAILED: uharfbuzz not installed, no shaping")
+            continue
+        result = benchmark(language, iterations)
+        ok = result['bytes'] <= PDF_SIZE_BUDGET_BYTES and result['p95_ms'] <= PDF_RENDER_BUDGET_MS
+        within_budget = within_budget and ok
+        print(f"{language:<10}{result['profile']:<16}{result['bytes']:>8}"
+              f"{result['mean_ms']:>10.1f}{result['p95_ms']:>10.1f}  {'ok' if ok else 'OVER BUDGET'}")
+    print(f"budget: {PDF_SIZE_BUDGET_BYTES} bytes, {PDF_RENDER_BUDGET_MS} ms p95 per one-page letter")
+    return 0 if within_budget else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
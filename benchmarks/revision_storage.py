@@ -0,0 +1,108 @@
+"""
+Benchmark revision history storage per revision and reconstruction latency for full snapshots,
+plain deltas and the default checkpointed delta policy.
+
+Usage: python benchmarks/revision_storage.py [revisions]
+"""
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from revision_delta import RevisionPolicy, replay, revision_policy
+from template_engine import render_letter
+
+# All three get the same history limit so the stored bytes compare like for like; plain deltas
+# still keep everything, as they have no checkpoint to restart the chain from
+POLICIES = {
+    'snapshots': RevisionPolicy(checkpoint_interval=1, history_limit=revision_policy.history_limit),
+    'deltas': RevisionPolicy(checkpoint_interval=0, checkpoint_ratio=float('inf'),
+                             history_limit=revision_policy.history_limit),
+    'default': revision_policy
+}
+
+EDITS = [
+    'I kindly request you to consider this application at the earliest.',
+    'The relevant documents are attached for your reference.',
+    'I will make sure that my pending work is completed before I leave.',
+    'Please let me know if any further information is required.'
+]
+
+
+def edit_history(base_text, revisions, seed=7):
+    """A reproducible run of small user edits: a changed word, a new sentence or a removed line"""
+    rng = random.Random(seed)
+    lines = base_text.splitlines(keepends=True)
+    texts = []
+    for _ in range(revisions):
+        index = rng.randrange(len(lines))
+        action = rng.random()
+        if action < 0.6:
+            lines[index] = lines[index].rstrip('\n') + f" ({rng.randint(1, 999)})\n"
+        elif action < 0.8 or len(lines) < 10:
+            lines.insert(index, rng.choice(EDITS) + '\n')
+        else:
+            del lines[index]
+        texts.append(''.join(lines))
+    return texts
+
+
+def store(policy, base_text, texts):
+    """Stored rows {revision: (delta, snapshot)} after the whole history, pruned like the database"""
+    rows = {}
+    previous = base_text
+    for number, text in enumerate(texts, start=1):
+        rows[number] = policy.encode(number, previous, text)
+        checkpoints = [revision for revision, (_, snapshot) in rows.items() if snapshot is not None]
+        oldest_kept = policy.oldest_kept(number, checkpoints)
+        rows = {revision: row for revision, row in rows.items() if revision >= oldest_kept}
+        previous = text
+    return rows
+
+
+def reconstruct(rows, base_text, revision):
+    checkpoints = [number for number, (_, snapshot) in rows.items() if snapshot is not None and number <= revision]
+    first = max(checkpoints, default=min(rows))
+    return replay(base_text, [rows[number] for number in range(first, revision + 1)])
+
+
+def benchmark(policy, base_text, texts):
+    rows = store(policy, base_text, texts)
+    stored = sum(len((delta or snapshot).encode('utf-8')) for delta, snapshot in rows.values())
+    timings = []
+    for revision in sorted(rows):
+        started = time.perf_counter()
+        content = reconstruct(rows, base_text, revision)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert content == texts[revision - 1], f"revision {revision} did not round-trip"
+    timings.sort()
+    return {
+        'kept': len(rows),
+        'bytes': stored,
+        'per_revision': stored / len(rows),
+        'mean_ms': sum(timings) / len(timings),
+        'p95_ms': timings[int(len(timings) * 0.95) - 1],
+        'max_ms': timings[-1]
+    }
+
+
+def main():
+    revisions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    base_text = render_letter('Leave Application', 'english', 'formal', 'Asha Patil', 'The Principal',
+                              'Medical leave', 'Fever and doctor-advised rest', '2025-07-01 to 2025-07-05')
+    texts = edit_history(base_text, revisions)
+    print(f"{revisions} revisions of a {len(texts[-1].encode('utf-8'))}-byte letter")
+    print(f"{'policy':<11}{'kept':>6}{'bytes':>10}{'bytes/rev':>11}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, policy in POLICIES.items():
+        result = benchmark(policy, base_text, texts)
+        print(f"{name:<11}{result['kept']:>6}{result['bytes']:>10}{result['per_revision']:>11.0f}"
+              f"{result['mean_ms']:>10.3f}{result['p95_ms']:>10.3f}{result['max_ms']:>10.3f}")
+    print(f"default: checkpoint every {revision_policy.checkpoint_interval} revisions or when a delta exceeds "
+          f"{revision_policy.checkpoint_ratio:.0%} of the text, keeping the last {revision_policy.history_limit}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import json
+import hashlib
+
+from markupsafe import Markup, escape
+
+from document_types import DOCUMENT_TYPES, DOCUMENT_CATEGORIES
+
+# document_types.DOCUMENT_TYPES labels categories by display name; these name the same categories
+CATEGORY_ALIASES = {
+    'General & Personal': 'general'
+}
+
+# DOCUMENT_TYPES names the prompt metadata of some types differently from the DOCUMENT_CATEGORIES listing;
+# each maps onto the listed name, which keeps its category and gains the description and fields
+TYPE_ALIASES = {
+    'Scholarship Application': 'Scholarship/Financial Aid Application',
+    'Character Certificate Application': 'Character Certificate Application (School/College)',
+    'Job Application': 'Job Application (Private Sector)',
+    'Business Proposal': 'Business Proposal Application',
+    'Vendor Registration Application': 'Vendor/Supplier Application',
+    'Tender Application': 'Tender Application (Private Sector Procurement)',
+    'RTI Application': 'Right to Information (RTI) Application',
+    'Aadhaar Card Application': 'Aadhaar Card Application/Update/Correction',
+    'PAN Card Application': 'PAN Card Application/Correction',
+    'Petition': 'Writ Petition',
+    'Application for Stay': 'Application for Stay of Proceedings',
+    'Complaint Letter': 'Complaint Application/Form'
+}
+
+CATALOG_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CATALOG_REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+class PrebuiltJSON:
+    """
+    JSON payload serialized once, with a strong ETag derived from its bytes
+    """
+
+    def __init__(self, value):
+        self.body = json.dumps(value, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+
+class Catalog:
+    """
+    Single registry of document categories and types, merged from both source catalogs at import time
+
+    Every type has a category key, description and fields; listings keep the order of DOCUMENT_CATEGORIES,
+    with types only known to DOCUMENT_TYPES appended to their category. Names in ``aliases`` are merged
+    onto their listed type and still resolve in lookups, so documents saved under them keep working.
+    """
+
+    def __init__(self, categories, document_types, aliases=None):
+        self.aliases = dict(aliases or {})
+        category_keys = {category['name']: key for key, category in categories.items()}
+        category_keys.update(CATEGORY_ALIASES)
+
+        self.categories = {
+            key: {'name': category['name'], 'icon': category['icon'], 'types': list(category['types'])}
+            for key, category in categories.items()
+        }
+        self.types = {}
+        for key, category in self.categories.items():
+            for name in category['types']:
+                self.types[name] = {'name': name, 'category': key, 'description': '', 'fields': []}
+
+        for name, info in document_types.items():
+            name = self.aliases.get(name, name)
+            key = category_keys.get(info['category'], 'general')
+            if name not in self.types:
+                self.types[name] = {'name': name, 'category': key}
+                self.categories[key]['types'].append(name)
+            self.types[name].update(description=info.get('description', ''), fields=list(info.get('fields', [])))
+
+        self.document = PrebuiltJSON({'categories': self.categories, 'types': self.types})
+        self.version = self.document.etag[:12]
+        self._category_documents = {key: PrebuiltJSON(category['types']) for key, category in self.categories.items()}
+        self._empty = PrebuiltJSON([])
+        self._fragment = None
+
+    def resolve(self, document_type):
+        """The listed name for a type name or one of its aliases"""
+        return self.aliases.get(document_type, document_type)
+
+    def __contains__(self, document_type):
+        return self.resolve(document_type) in self.types
+
+    def get(self, document_type, default=None):
+        return self.types.get(self.resolve(document_type), default)
+
+    def category_of(self, document_type, default='general'):
+        info = self.get(document_type)
+        return info['category'] if info else default
+
+    @property
+    def type_names(self):
+        return list(self.types)
+
+    def category_document(self, key):
+        """Pre-built JSON list of type names for one category (an empty list for unknown keys)"""
+        return self._category_documents.get(key, self._empty)
+
+    def index_fragment(self):
+        """
+        Catalog markup for the home page, rendered once per process
+
+        Category cards plus the whole catalog as embedded JSON, so the page needs no per-category requests.
+        """
+        if self._fragment is None:
+            parts = [f'<div class="document-catalog" data-catalog-version="{self.version}">']
+            for key, category in self.categories.items():
+                parts.append(
+                    f'<div class="category-card" data-category="{escape(key)}">'
+                    f'<span class="category-icon">{escape(category["icon"])}</span>'
+                    f'<span class="category-name">{escape(category["name"])}</span>'
+                    f'<span class="category-count">{len(category["types"])}</span>'
+                    f'</div>'
+                )
+            # Escape '<' so document text can never close the script element
+            payload = self.document.body.decode('utf-8').replace('<', '\\u003c')
+            parts.append(f'<script type="application/json" id="catalog-data">{payload}</script>')
+            parts.append('</div>')
+            self._fragment = Markup("".join(parts))
+        return self._fragment
+
+
+catalog = Catalog(DOCUMENT_CATEGORIES, DOCUMENT_TYPES, TYPE_ALIASES)
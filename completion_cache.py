@@ -0,0 +1,263 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import time
+
+from flask import has_app_context
+from sqlalchemy import delete, func, select, update
+
+from singleflight import single_flight, flight_key
+from upsert import dialect_insert
+
+
+def make_cache_key(model, messages, temperature, **params):
+    """
+    Build a content-addressed key from the fully rendered prompt and sampling parameters
+    """
+    payload = {
+        'model': model,
+        'messages': messages,
+        'temperature': temperature,
+        'params': params
+    }
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+class MemoryCacheTier:
+    """
+    In-process LRU tier with TTL and size-based eviction
+    """
+    name = 'memory'
+
+    def __init__(self, max_entries=512, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            content, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return content
+
+    def set(self, key, content, model=None):
+        with self._lock:
+            self._entries[key] = (content, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DatabaseCacheTier:
+    """
+    Persistent tier stored in the completion_cache table via SQLAlchemy
+    """
+    name = 'database'
+
+    def __init__(self, max_entries=10000, ttl_seconds=7 * 24 * 3600, prune_every=50):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _table(self):
+        # Imported lazily: models imports app, which imports the generators using this cache
+        from models import CompletionCacheEntry
+        return CompletionCacheEntry.__table__
+
+    def _engine(self):
+        # Own connections, so a cache lookup never commits or rolls back the request's session
+        from app import db
+        return db.engine
+
+    def get(self, key):
+        if not has_app_context():
+            return None
+
+        table = self._table()
+        try:
+            with self._engine().connect() as connection:
+                row = connection.execute(
+                    select(table.c.content, table.c.expires_at).where(table.c.cache_key == key)
+                ).first()
+            if row is None:
+                return None
+            if row.expires_at < datetime.utcnow():
+                with self._engine().begin() as connection:
+                    connection.execute(delete(table).where(table.c.cache_key == key,
+                                                           table.c.expires_at < datetime.utcnow()))
+                return None
+            return row.content
+        except Exception as e:
+            logging.warning(f"Completion cache read failed: {str(e)}")
+            return None
+
+    def set(self, key, content, model=None):
+        if not has_app_context():
+            return
+
+        table = self._table()
+        now = datetime.utcnow()
+        values = {'cache_key': key, 'model': model or 'unknown', 'content': content,
+                  'created_at': now, 'expires_at': now + timedelta(seconds=self.ttl_seconds)}
+        engine = self._engine()
+        insert = dialect_insert(engine.dialect.name)
+        try:
+            with engine.begin() as connection:
+                if insert is None:
+                    updated = connection.execute(
+                        update(table).where(table.c.cache_key == key).values(**values)
+                    ).rowcount
+                    if not updated:
+                        connection.execute(table.insert().values(**values))
+                else:
+                    statement = insert(table).values(**values)
+                    connection.execute(statement.on_conflict_do_update(
+                        index_elements=['cache_key'],
+                        set_={column: statement.excluded[column]
+                              for column in ('model', 'content', 'created_at', 'expires_at')}
+                    ))
+        except Exception as e:
+            logging.warning(f"Completion cache write failed: {str(e)}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % self.prune_every == 0
+        if should_prune:
+            self.prune()
+
+    def prune(self):
+        """
+        Drop expired rows, then the oldest rows beyond max_entries
+        """
+        if not has_app_context():
+            return
+
+        table = self._table()
+        try:
+            with self._engine().begin() as connection:
+                connection.execute(delete(table).where(table.c.expires_at < datetime.utcnow()))
+
+                excess = connection.execute(select(func.count()).select_from(table)).scalar() - self.max_entries
+                if excess > 0:
+                    oldest_ids = select(table.c.id).order_by(table.c.created_at.asc()).limit(excess)
+                    connection.execute(delete(table).where(
+                        table.c.id.in_([row.id for row in connection.execute(oldest_ids)])
+                    ))
+        except Exception as e:
+            logging.warning(f"Completion cache prune failed: {str(e)}")
+
+    def clear(self):
+        if not has_app_context():
+            return
+
+        with self._engine().begin() as connection:
+            connection.execute(delete(self._table()))
+
+
+class CompletionCache:
+    """
+    Multi-tier completion cache; tiers are consulted in order and hits are promoted upwards
+    """
+
+    def __init__(self, tiers):
+        self.tiers = list(tiers)
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'writes': 0}
+        for tier in self.tiers:
+            self._counters[f'{tier.name}_hits'] = 0
+
+    def _bump(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def get(self, key):
+        for index, tier in enumerate(self.tiers):
+            content = tier.get(key)
+            if content is not None:
+                self._bump('hits')
+                self._bump(f'{tier.name}_hits')
+                for upper_tier in self.tiers[:index]:
+                    upper_tier.set(key, content)
+                return content
+        self._bump('misses')
+        return None
+
+    def set(self, key, content, model=None):
+        self._bump('writes')
+        for tier in self.tiers:
+            tier.set(key, content, model=model)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self):
+        """Return a snapshot of hit/miss counters"""
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def _build_default_cache():
+    if os.environ.get("COMPLETION_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return CompletionCache([])
+
+    tiers = [MemoryCacheTier(
+        max_entries=int(os.environ.get("COMPLETION_CACHE_SIZE", "512")),
+        ttl_seconds=int(os.environ.get("COMPLETION_CACHE_TTL", "3600"))
+    )]
+    if os.environ.get("COMPLETION_CACHE_PERSISTENT", "true").lower() not in ("0", "false", "no"):
+        tiers.append(DatabaseCacheTier(
+            max_entries=int(os.environ.get("COMPLETION_CACHE_DB_SIZE", "10000")),
+            ttl_seconds=int(os.environ.get("COMPLETION_CACHE_DB_TTL", str(7 * 24 * 3600)))
+        ))
+    return CompletionCache(tiers)
+
+
+completion_cache = _build_default_cache()
+
+
+def cached_completion(model, messages, temperature, create, cache=None, **params):
+    """
+    Return the cached completion for this prompt, or call ``create()`` and cache its result
+    """
+    cache = cache if cache is not None else completion_cache
+    key = make_cache_key(model, messages, temperature, **params)
+
+    content = cache.get(key)
+    if content is not None:
+        logging.debug(f"Completion cache hit for {key[:12]}")
+        return content
+
+    def create_and_cache():
+        content = create()
+        if content:
+            cache.set(key, content, model=model)
+        return content
+
+    # Concurrent identical prompts share one LLM call, also across workers
+    return single_flight.do(flight_key('completion', key), create_and_cache)
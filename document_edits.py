@@ -0,0 +1,186 @@
+import re
+import json
+import logging
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import DocumentRevision
+from completion_cache import completion_cache, make_cache_key
+from llm_client import LLM_MODEL
+from openai_service import improve_letter_paragraphs, improve_letter_content
+from revision_delta import replay, revision_policy
+
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+
+
+class RevisionConflict(Exception):
+    """Another save of the same document took the revision number first"""
+
+
+def split_paragraphs(text):
+    """Paragraphs separated by blank lines; line breaks inside a paragraph are kept"""
+    return [paragraph.strip('\n').rstrip() for paragraph in PARAGRAPH_BREAK.split(text or '')
+            if paragraph.strip()]
+
+
+def join_paragraphs(paragraphs):
+    return "\n\n".join(paragraphs)
+
+
+def _paragraph_key(instruction, paragraph):
+    return make_cache_key(LLM_MODEL, [instruction, paragraph], 0.3, purpose='paragraph-edit')
+
+
+def _edit_paragraphs(paragraphs, instruction):
+    """
+    New paragraph list for an edit request; paragraphs seen before with the same instruction are
+    resolved from the cache and only the rest are sent to the model
+
+    Returns (paragraphs, number of paragraphs sent to the model).
+    """
+    resolved = {}
+    pending = {}
+    for index, paragraph in enumerate(paragraphs):
+        cached = completion_cache.get(_paragraph_key(instruction, paragraph))
+        if cached is not None:
+            resolved[index] = json.loads(cached)['text']
+        else:
+            pending[index + 1] = paragraph
+
+    if pending:
+        edits = improve_letter_paragraphs(pending, instruction)
+        for number, paragraph in pending.items():
+            replacement = edits.get(number)
+            if replacement == paragraph:
+                replacement = None
+            resolved[number - 1] = replacement
+            completion_cache.set(_paragraph_key(instruction, paragraph),
+                                 json.dumps({'text': replacement}, ensure_ascii=False), model=LLM_MODEL)
+
+    edited = []
+    for index, paragraph in enumerate(paragraphs):
+        replacement = resolved.get(index)
+        # None keeps the paragraph; "" deletes it; blank lines split a replacement into several
+        edited.extend([paragraph] if replacement is None else split_paragraphs(replacement))
+    return edited, len(pending)
+
+
+def latest_revision_number(document_id):
+    return db.session.query(db.func.max(DocumentRevision.revision)).filter(
+        DocumentRevision.document_id == document_id
+    ).scalar() or 0
+
+
+def _checkpoint_revisions(document_id):
+    return [revision for (revision,) in db.session.query(DocumentRevision.revision).filter(
+        DocumentRevision.document_id == document_id,
+        DocumentRevision.snapshot.isnot(None)
+    )]
+
+
+def record_revision(document, content, instruction=None, source='manual'):
+    """
+    Store new text as edited_content plus a revision holding a line delta against the previous one
+    (or a full checkpoint, see RevisionPolicy), dropping history beyond the policy's limit; returns
+    the revision, or None when nothing changed
+
+    The document row is locked (SELECT ... FOR UPDATE) so concurrent saves are serialised and each
+    deltas against the text the other one stored; where row locks are not supported a lost race
+    raises RevisionConflict.
+    """
+    db.session.refresh(document, with_for_update=True)
+    previous = document.final_content
+    if content == previous:
+        return None
+
+    latest = latest_revision_number(document.id)
+    number = latest + 1
+    # Edits saved before revisions existed are not reachable from generated_content by replay
+    diff, snapshot = revision_policy.encode(number, previous, content,
+                                            force_checkpoint=latest == 0 and previous != document.generated_content)
+    revision = DocumentRevision(
+        document_id=document.id,
+        revision=number,
+        diff=diff,
+        snapshot=snapshot,
+        instruction=instruction,
+        source=source
+    )
+    document.edited_content = content
+    try:
+        db.session.add(revision)
+        checkpoints = _checkpoint_revisions(document.id) + ([number] if snapshot is not None else [])
+        oldest_kept = revision_policy.oldest_kept(number, checkpoints)
+        if oldest_kept > 1:
+            DocumentRevision.query.filter(DocumentRevision.document_id == document.id,
+                                          DocumentRevision.revision < oldest_kept).delete(synchronize_session=False)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise RevisionConflict(f"Revision {number} of document {document.id} was saved concurrently")
+    return revision
+
+
+def improve_document(document, instruction):
+    """
+    Apply an improvement request as targeted paragraph edits
+
+    Falls back to a full rewrite if the model does not return a usable patch. Returns
+    (revision or None, paragraphs sent to the model).
+    """
+    instruction = " ".join(instruction.split())
+    paragraphs = split_paragraphs(document.final_content)
+    try:
+        edited, sent = _edit_paragraphs(paragraphs, instruction)
+    except (ValueError, KeyError, TypeError) as e:
+        logging.warning(f"Paragraph edit failed for document {document.id}, rewriting in full: {str(e)}")
+        edited, sent = split_paragraphs(improve_letter_content(document.final_content, instruction)), len(paragraphs)
+
+    if edited == paragraphs:
+        return None, sent
+    revision = record_revision(document, join_paragraphs(edited), instruction, source='llm' if sent else 'cache')
+    return revision, sent
+
+
+def revision_content(document, revision_number):
+    """
+    Document text as of a revision (0 is the generated content), replayed from the nearest checkpoint;
+    None if the revision does not exist or was dropped from the history
+    """
+    if revision_number == 0:
+        return document.generated_content
+    if revision_number < 0:
+        return None
+
+    checkpoint = db.session.query(db.func.max(DocumentRevision.revision)).filter(
+        DocumentRevision.document_id == document.id,
+        DocumentRevision.revision <= revision_number,
+        DocumentRevision.snapshot.isnot(None)
+    ).scalar()
+    first = checkpoint or 1
+    rows = (db.session.query(DocumentRevision.revision, DocumentRevision.diff, DocumentRevision.snapshot)
+            .filter(DocumentRevision.document_id == document.id,
+                    DocumentRevision.revision >= first,
+                    DocumentRevision.revision <= revision_number)
+            .order_by(DocumentRevision.revision)
+            .all())
+    if len(rows) != revision_number - first + 1 or rows[0].revision != first:
+        return None
+    return replay(document.generated_content, [(row.diff, row.snapshot) for row in rows])
+
+
+def revision_storage(document_id):
+    """Revision count and stored characters of a document's history, split into deltas and checkpoints"""
+    revisions, checkpoints, delta_chars, snapshot_chars = db.session.query(
+        db.func.count(DocumentRevision.id),
+        db.func.count(DocumentRevision.snapshot),
+        db.func.coalesce(db.func.sum(db.func.length(DocumentRevision.diff)), 0),
+        db.func.coalesce(db.func.sum(db.func.length(DocumentRevision.snapshot)), 0)
+    ).filter(DocumentRevision.document_id == document_id).one()
+    return {
+        'revisions': revisions,
+        'checkpoints': checkpoints,
+        'delta_chars': int(delta_chars),
+        'checkpoint_chars': int(snapshot_chars)
+    }
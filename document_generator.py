@@ -1,84 +1,114 @@
-import os
-from openai import OpenAI
+import time
+from completion_cache import cached_completion, completion_cache, make_cache_key
+from template_engine import fast_path, render_letter, date_range_label
+from llm_client import LLM_MODEL
+from llm_router import llm_router
+from token_budget import token_budget
+from rate_limit import RateLimitExceeded
+from prompt_templates import prompt_compiler
 import logging
 
-# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-# do not change this unless explicitly requested by the user
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "your-openai-api-key")
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-def generate_document_content(document_type, language, tone, sender_name, recipient_name, 
+def build_document_messages(document_type, language, tone, sender_name, recipient_name,
                             purpose, reason=None, date_from=None, date_to=None):
     """
-    Generate document content using OpenAI GPT-4o
+    Build the chat messages for a document generation request from the precompiled prompt
+    """
+    return prompt_compiler.build(document_type, language, tone,
+                                 sender_name=sender_name,
+                                 recipient_name=recipient_name,
+                                 purpose=purpose,
+                                 reason=reason,
+                                 date_range=date_range_label(date_from, date_to))
+
+def _render_from_template(document_type, language, tone, sender_name, recipient_name,
+                          purpose, reason=None, date_from=None, date_to=None):
+    return render_letter(document_type, language, tone, sender_name, recipient_name,
+                         purpose, reason, date_range_label(date_from, date_to))
+
+def generate_document_content(document_type, language, tone, sender_name, recipient_name,
+                            purpose, reason=None, date_from=None, date_to=None, mode=None, timeout=None):
+    """
+    Generate document content using OpenAI GPT-4o, or the template engine when requested or when the LLM is unavailable
+
+    ``timeout`` bounds the LLM call including retries and failover (LLM_TIMEOUT by default).
     """
+    if fast_path.use_template(mode):
+        return _render_from_template(document_type, language, tone, sender_name, recipient_name,
+                                     purpose, reason, date_from, date_to)
+
     try:
-        # Build the prompt based on inputs
-        language_names = {
-            'english': 'English',
-            'hindi': 'Hindi',
-            'marathi': 'Marathi'
-        }
-        
-        tone_descriptions = {
-            'formal': 'very formal and professional',
-            'semi_formal': 'semi-formal and respectful',
-            'friendly': 'friendly but professional'
-        }
-        
-        prompt = f"""
-Generate a complete {document_type} in {language_names.get(language, 'English')} language.
-
-Document Details:
-- Type: {document_type}
-- Language: {language_names.get(language, 'English')}
-- Tone: {tone_descriptions.get(tone, 'formal')}
-- Sender: {sender_name}
-- Recipient: {recipient_name}
-- Purpose: {purpose}
-"""
-        
-        if reason:
-            prompt += f"- Reason/Additional Details: {reason}\n"
-        
-        if date_from:
-            prompt += f"- Start Date: {date_from}\n"
-        
-        if date_to:
-            prompt += f"- End Date: {date_to}\n"
-        
-        prompt += f"""
-Requirements:
-1. Create a properly formatted {document_type} with appropriate headers, salutations, and closings
-2. Use {tone_descriptions.get(tone, 'formal')} tone throughout
-3. Include all necessary details based on the purpose provided
-4. Follow standard format for this type of document
-5. Make it professional and complete
-6. Include proper date formatting and addressing
-7. If writing in Hindi or Marathi, use proper script and formal language conventions
-8. End with appropriate closing and signature line
-
-Generate the complete document content now:
-"""
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are an expert document writer who creates professional letters, applications, and official documents in multiple languages. Always generate complete, properly formatted documents."
-                },
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=2000,
-            temperature=0.7
-        )
-        
-        generated_content = response.choices[0].message.content.strip()
-        
+        messages = build_document_messages(document_type, language, tone, sender_name, recipient_name,
+                                           purpose, reason, date_from, date_to)
+        max_tokens = token_budget.max_tokens(document_type, language)
+
+        def create():
+            fast_path.record_call()
+            started = time.monotonic()
+            content = llm_router.complete(messages, max_tokens=max_tokens, temperature=0.7,
+                                          timeout=timeout or fast_path.llm_timeout)
+            fast_path.record_success(time.monotonic() - started)
+            return content
+
+        generated_content = cached_completion(LLM_MODEL, messages, 0.7, create, max_tokens=max_tokens)
+
         logging.info(f"Successfully generated {document_type} for {sender_name}")
         return generated_content
-        
+
+    except RateLimitExceeded:
+        # Our own provider quota is spent; the caller answers 429 instead of serving a template
+        raise
     except Exception as e:
+        fast_path.record_failure()
         logging.error(f"Error generating document content: {str(e)}")
+        if fast_path.fallback_enabled:
+            return llm_router.fallback(lambda: _render_from_template(
+                document_type, language, tone, sender_name, recipient_name, purpose, reason, date_from, date_to))
+        raise Exception(f"Failed to generate document: {str(e)}")
+
+def stream_document_content(document_type, language, tone, sender_name, recipient_name,
+                            purpose, reason=None, date_from=None, date_to=None, mode=None):
+    """
+    Stream document content from OpenAI GPT-4o, yielding text deltas as they arrive
+    """
+    if fast_path.use_template(mode):
+        yield _render_from_template(document_type, language, tone, sender_name, recipient_name,
+                                    purpose, reason, date_from, date_to)
+        return
+
+    messages = build_document_messages(document_type, language, tone, sender_name, recipient_name,
+                                       purpose, reason, date_from, date_to)
+    max_tokens = token_budget.max_tokens(document_type, language)
+    cache_key = make_cache_key(LLM_MODEL, messages, 0.7, max_tokens=max_tokens)
+
+    cached = completion_cache.get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    try:
+        fast_path.record_call()
+        started = time.monotonic()
+        for delta in llm_router.stream(messages, max_tokens=max_tokens, temperature=0.7,
+                                       timeout=fast_path.llm_timeout):
+            parts.append(delta)
+            yield delta
+
+        fast_path.record_success(time.monotonic() - started)
+        generated_content = "".join(parts).strip()
+        if generated_content:
+            completion_cache.set(cache_key, generated_content, model=LLM_MODEL)
+
+        logging.info(f"Successfully streamed {document_type} for {sender_name}")
+
+    except RateLimitExceeded:
+        raise
+    except Exception as e:
+        fast_path.record_failure()
+        logging.error(f"Error streaming document content: {str(e)}")
+        # Only fall back if nothing has reached the client yet
+        if fast_path.fallback_enabled and not parts:
+            yield llm_router.fallback(lambda: _render_from_template(
+                document_type, language, tone, sender_name, recipient_name, purpose, reason, date_from, date_to))
+            return
         raise Exception(f"Failed to generate document: {str(e)}")
@@ -176,49 +176,118 @@ DOCUMENT_TYPES = {
     }
 }
 
-# Categories for easier navigation
-CATEGORIES = {
-    "Academic & Educational": [
-        "University/College Admission Application",
-        "Scholarship Application", 
-        "Bonafide Certificate Application",
-        "Migration Certificate Application",
-        "Character Certificate Application",
-        "Leave Application"
-    ],
-    "Corporate & Business": [
-        "Job Application",
-        "Business Proposal",
-        "Vendor Registration Application", 
-        "Tender Application",
-        "Franchise Application"
-    ],
-    "Government & Public Service": [
-        "RTI Application",
-        "Aadhaar Card Application",
-        "PAN Card Application",
-        "Passport Application",
-        "Driving License Application",
-        "Voter ID Application",
-        "Income Certificate Application",
-        "Caste Certificate Application", 
-        "Domicile Certificate Application"
-    ],
-    "Court & Judicial": [
-        "Bail Application",
-        "Petition",
-        "Application for Adjournment",
-        "Application for Stay",
-        "Caveat Application"
-    ],
-    "General & Personal": [
-        "Complaint Letter",
-        "Request Letter", 
-        "Resignation Letter",
-        "Cover Letter",
-        "Recommendation Letter",
-        "Invitation Letter",
-        "Apology Letter",
-        "Thank You Letter"
-    ]
+# Category listing shown in the UI; catalog.py merges it with DOCUMENT_TYPES
+DOCUMENT_CATEGORIES = {
+    'academic': {
+        'name': 'Academic & Educational',
+        'icon': '🎓',
+        'types': [
+            'University/College Admission Application',
+            'Scholarship/Financial Aid Application',
+            'Bonafide Certificate Application',
+            'Migration Certificate Application',
+            'Character Certificate Application (School/College)',
+            'Provisional Certificate Application',
+            'Degree Certificate Application',
+            'No Dues Certificate Application (College/Hostel)',
+            'Change of Name Application (Academic Records)',
+            'Re-evaluation/Re-checking Application (Exams)',
+            'Duplicate Marksheet/Certificate Application',
+            'Withdrawal Application (from course, college)',
+            'Application for Inter-College Transfer',
+            'Application for Leave of Absence (Academic)',
+            'Application for Readmission',
+            'Application for Industrial Training/Internship',
+            'Application for Campus Placement',
+            'Request for Academic Records/Transcript'
+        ]
+    },
+    'corporate': {
+        'name': 'Corporate & Business',
+        'icon': '💼',
+        'types': [
+            'Job Application (Private Sector)',
+            'Business Proposal Application',
+            'Vendor/Supplier Application',
+            'Franchise Application',
+            'Tender Application (Private Sector Procurement)',
+            'Expression of Interest (EOI) Application',
+            'Partnership/Joint Venture Application',
+            'Vendor Empanelment Application',
+            'Dealer/Distributor Application',
+            'Client Onboarding Application',
+            'Application for Company Registration/Incorporation',
+            'Application for Statutory Licenses',
+            'Application for Tax Registration',
+            'Application for Tax Refund (Corporate)',
+            'Application for Environmental Clearances (Industrial)',
+            'Application for Factory License',
+            'Application for Export/Import Code (IEC)',
+            'Request for Quotation/Proposal (RFQ/RFP)'
+        ]
+    },
+    'government': {
+        'name': 'Government & Public Service',
+        'icon': '🏛️',
+        'types': [
+            'Aadhaar Card Application/Update/Correction',
+            'PAN Card Application/Correction',
+            'Passport Application',
+            'Voter ID Application',
+            'Birth Certificate Application/Correction',
+            'Death Certificate Application/Correction',
+            'Marriage Registration Application',
+            'Domicile Certificate Application',
+            'Caste Certificate Application',
+            'Income Certificate Application',
+            'Character Certificate Application (Police Clearance)',
+            'Ration Card Application',
+            'Driving License Application',
+            'Vehicle Registration/Transfer Application',
+            'Building Permit Application',
+            'Trade License Application',
+            'Right to Information (RTI) Application',
+            'Public Grievance Application',
+            'Property Registration Application',
+            'Utility Connection Application'
+        ]
+    },
+    'legal': {
+        'name': 'Court & Judicial',
+        'icon': '⚖️',
+        'types': [
+            'Writ Petition',
+            'Divorce Petition',
+            'Guardianship Petition',
+            'Bail Application',
+            'Application for Stay of Proceedings',
+            'Application for Adjournment',
+            'Application for Condonation of Delay',
+            'Application for Amendment',
+            'Application for Execution of Decree',
+            'Application for Contempt of Court Proceedings',
+            'Application for Review/Revision of Order',
+            'Application for Transfer of Case',
+            'Application for Maintenance',
+            'Application for Interim Injunction',
+            'Habeas Corpus Petition',
+            'Mandamus Petition',
+            'Consumer Complaint Application'
+        ]
+    },
+    'general': {
+        'name': 'General Applications',
+        'icon': '📝',
+        'types': [
+            'Leave Application',
+            'Refund/Reimbursement Application',
+            'Club/Society Membership Application',
+            'Volunteer Application',
+            'Event Registration Application',
+            'Pet Adoption Application',
+            'Contest/Competition Entry Application',
+            'Complaint Application/Form',
+            'Request for Permission'
+        ]
+    }
 }
@@ -0,0 +1,134 @@
+import os
+import zipfile
+import tempfile
+
+from reportlab.platypus import Flowable, PageBreak
+
+from app import db
+from models import GeneratedDocument
+from pdf_generator import get_layout_profile, SimpleDocDocument
+from pdf_pool import render_pdf
+
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "100"))
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkSink:
+    """
+    Write-only, non-seekable file object whose contents are drained after every document
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class _SectionFeed(Flowable):
+    """
+    Zero-size placeholder kept at the end of the story; the document swaps it for the next section
+    """
+
+    def __init__(self, sections):
+        super().__init__()
+        self.sections = iter(sections)
+
+    def wrap(self, available_width, available_height):
+        return 0, 0
+
+    def draw(self):
+        pass
+
+
+class _SectionedDocument(SimpleDocDocument):
+    """
+    Document built one section at a time through ReportLab's filterFlowables hook, so only the
+    section being laid out is alive instead of the whole export's story
+    """
+
+    def filterFlowables(self, flowables):
+        while flowables and isinstance(flowables[0], _SectionFeed):
+            feed = flowables[0]
+            section = next(feed.sections, None)
+            # None is skipped by handle_flowable once the sections run out
+            flowables[0:1] = [None] if section is None else [*section, feed]
+
+
+def iter_documents(query):
+    """
+    Iterate over documents from a server-side cursor, EXPORT_BATCH_SIZE rows at a time
+    """
+    statement = query.order_by(GeneratedDocument.id).statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+    for document in db.session.execute(statement).scalars():
+        yield document
+        # Keep the identity map from growing with the export
+        db.session.expunge(document)
+
+
+def _letter_data(document):
+    return {
+        'content': document.final_content,
+        'document_type': document.document_type,
+        'language': document.language,
+        'sender_name': document.sender_name,
+        'recipient_name': document.recipient_name,
+        'generated_on': document.created_at
+    }
+
+
+def _export_filename(document):
+    document_type = document.document_type.replace('/', '_').replace(' ', '_')
+    return f"{document.id}_{document_type}.pdf"
+
+
+def stream_zip_export(query, extra_files=None):
+    """
+    Yield a ZIP of per-document PDFs, rendering and emitting one row at a time; ``extra_files`` maps
+    archive names to bytes added at the end
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for document in iter_documents(query):
+            pdf_buffer = render_pdf(_letter_data(document))
+            archive.writestr(_export_filename(document), pdf_buffer.getvalue())
+            data = sink.drain()
+            if data:
+                yield data
+        for name, content in (extra_files or {}).items():
+            archive.writestr(name, content)
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def stream_merged_pdf_export(query):
+    """
+    Yield one PDF with every document starting on a new page, each in its own language's layout
+
+    Rows and flowables are pulled one document at a time, but ReportLab can only write the file once
+    the last page is laid out, so the output is spooled to a temporary file and then streamed.
+    """
+    def sections():
+        for index, document in enumerate(iter_documents(query)):
+            story = get_layout_profile(language=document.language).build_story(_letter_data(document))
+            yield story if index == 0 else [PageBreak(), *story]
+
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        doc = _SectionedDocument(spool, pagesize=get_layout_profile().pagesize)
+        doc.build([_SectionFeed(sections())])
+        spool.seek(0)
+        while True:
+            chunk = spool.read(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,72 @@
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import load_only
+
+from models import GeneratedDocument
+
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+HISTORY_FILTERS = ('category', 'language', 'document_type')
+
+SUMMARY_COLUMNS = (
+    GeneratedDocument.id,
+    GeneratedDocument.document_type,
+    GeneratedDocument.category,
+    GeneratedDocument.language,
+    GeneratedDocument.sender_name,
+    GeneratedDocument.recipient_name,
+    GeneratedDocument.is_demo,
+    GeneratedDocument.created_at
+)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(document):
+    raw = f"{document.created_at.isoformat()}|{document.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, document_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(document_id)
+    except (ValueError, binascii.Error, UnicodeError) as e:
+        raise InvalidCursor(str(e))
+
+
+def list_history(session_id, filters=None, cursor=None, limit=HISTORY_PAGE_SIZE):
+    """
+    One page of a session's documents, newest first, paginated on (created_at, id)
+
+    Returns (documents, next_cursor); only summary columns are loaded.
+    """
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    query = (GeneratedDocument.query
+             .options(load_only(*SUMMARY_COLUMNS))
+             .filter(GeneratedDocument.session_id == session_id))
+
+    for field in HISTORY_FILTERS:
+        value = (filters or {}).get(field)
+        if value:
+            query = query.filter(getattr(GeneratedDocument, field) == value)
+
+    if cursor:
+        created_at, document_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            GeneratedDocument.created_at < created_at,
+            and_(GeneratedDocument.created_at == created_at, GeneratedDocument.id < document_id)
+        ))
+
+    rows = (query.order_by(GeneratedDocument.created_at.desc(), GeneratedDocument.id.desc())
+            .limit(limit + 1)
+            .all())
+
+    documents = rows[:limit]
+    next_cursor = encode_cursor(documents[-1]) if len(rows) > limit else None
+    return documents, next_cursor
@@ -0,0 +1,208 @@
+import os
+import json
+import queue
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, date, timedelta
+
+from app import db
+from models import GenerationJob
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+def _encode_params(params):
+    """Serialize job parameters, keeping dates as ISO strings"""
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, (date, datetime)) else value
+        for key, value in params.items()
+    }, ensure_ascii=False)
+
+
+def _decode_params(raw):
+    params = json.loads(raw)
+    for key in ('date_from', 'date_to'):
+        if params.get(key):
+            params[key] = date.fromisoformat(params[key])
+    return params
+
+
+class JobQueue:
+    """
+    Background worker pool that drains generation jobs stored in the generation_jobs table
+
+    The generator runs on the worker thread and is called with ``timeout=``; it must pass that on to
+    its LLM call so a hung upstream request fails there instead of holding a worker forever.
+    """
+
+    def __init__(self, app, generator, persist, workers=2, timeout=60, max_attempts=3, retry_backoff=2.0,
+                 kwargs_for=None, kind='generate'):
+        self.app = app
+        self.kind = kind
+        self.generator = generator
+        self.persist = persist
+        self.kwargs_for = kwargs_for or (lambda params: {key: value for key, value in params.items()
+                                                           if key != 'category'})
+        self.workers = workers
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue()
+        self._threads = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads and re-enqueue jobs left over from a previous process"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'job-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+        with self.app.app_context():
+            # Jobs stuck in "running" well past their deadline belong to a worker that died
+            stale_before = datetime.utcnow() - timedelta(
+                seconds=(self.timeout + self.retry_backoff * 2 ** self.max_attempts) * self.max_attempts
+            )
+            GenerationJob.query.filter(
+                GenerationJob.kind == self.kind,
+                GenerationJob.status == JOB_RUNNING,
+                GenerationJob.started_at < stale_before
+            ).update({'status': JOB_QUEUED}, synchronize_session=False)
+            db.session.commit()
+
+            pending = (GenerationJob.query.filter_by(kind=self.kind, status=JOB_QUEUED)
+                       .order_by(GenerationJob.created_at)
+                       .with_entities(GenerationJob.id).all())
+            for row in pending:
+                self._queue.put(row.id)
+
+    def enqueue(self, params):
+        """Persist a new job and hand it to the worker pool, returning the job row"""
+        return self.enqueue_many([params])[0]
+
+    def enqueue_many(self, params_list, batch_id=None):
+        """Persist several jobs in one transaction and hand them to the worker pool in order"""
+        self.start()
+
+        jobs = [GenerationJob(
+            id=str(uuid.uuid4()),
+            kind=self.kind,
+            batch_id=batch_id,
+            status=JOB_QUEUED,
+            params=_encode_params(params),
+            max_attempts=self.max_attempts
+        ) for params in params_list]
+        db.session.add_all(jobs)
+        db.session.commit()
+
+        for job in jobs:
+            self._queue.put(job.id)
+        return jobs
+
+    def shutdown(self, wait=True, timeout=30):
+        """Stop accepting work and let in-flight jobs finish; unstarted jobs stay queued in the database"""
+        with self._lock:
+            if not self._threads:
+                return
+            self._stopping.set()
+            for _ in self._threads:
+                self._queue.put(None)
+            threads, self._threads = self._threads, []
+
+        if wait:
+            deadline = time.monotonic() + timeout
+            for thread in threads:
+                thread.join(max(0, deadline - time.monotonic()))
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                if job_id is None or self._stopping.is_set():
+                    return
+                with self.app.app_context():
+                    self._process(job_id)
+            except Exception as e:
+                logging.error(f"Job worker crashed on {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _claim(self, job_id):
+        """Atomically move a queued job to running so only one worker (in any process) picks it up"""
+        claimed = GenerationJob.query.filter_by(id=job_id, status=JOB_QUEUED).update(
+            {'status': JOB_RUNNING, 'started_at': datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.session.commit()
+        return claimed == 1
+
+    def _process(self, job_id):
+        if not self._claim(job_id):
+            return
+
+        job = db.session.get(GenerationJob, job_id)
+        params = _decode_params(job.params)
+        generator_kwargs = self.kwargs_for(params)
+
+        while True:
+            job.attempts += 1
+            db.session.commit()
+
+            try:
+                content = self.generator(timeout=self.timeout, **generator_kwargs)
+
+                document = self.persist(params, content)
+                job.document_id = document.id
+                job.status = JOB_SUCCEEDED
+                job.error = None
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                logging.info(f"Job {job_id} succeeded after {job.attempts} attempt(s)")
+                return
+
+            except Exception as e:
+                db.session.rollback()
+                error = str(e)
+
+            job.error = error
+            logging.warning(f"Job {job_id} attempt {job.attempts} failed: {error}")
+
+            if job.attempts >= job.max_attempts:
+                job.status = JOB_FAILED
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                return
+
+            if self._stopping.is_set():
+                # Leave the job for the next process to pick up
+                job.status = JOB_QUEUED
+                db.session.commit()
+                return
+
+            db.session.commit()
+            self._stopping.wait(self.retry_backoff * (2 ** (job.attempts - 1)))
+
+
+def create_job_queue(app, generator, persist, kwargs_for=None, kind='generate', workers=None):
+    """Build a job queue configured from environment variables"""
+    return JobQueue(
+        app,
+        generator=generator,
+        persist=persist,
+        kwargs_for=kwargs_for,
+        kind=kind,
+        workers=workers or int(os.environ.get("JOB_WORKERS", "2")),
+        timeout=float(os.environ.get("JOB_TIMEOUT", "60")),
+        max_attempts=int(os.environ.get("JOB_MAX_ATTEMPTS", "3")),
+        retry_backoff=float(os.environ.get("JOB_RETRY_BACKOFF", "2"))
+    )
@@ -0,0 +1,231 @@
+import os
+import time
+import atexit
+import random
+import logging
+import threading
+
+import httpx
+from openai import OpenAI, APIConnectionError, APIStatusError
+
+from rate_limit import rate_limiter, CHARS_PER_TOKEN
+
+# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
+# do not change this unless explicitly requested by the user
+LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4o")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() not in ("0", "false", "no")
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class LLMClient:
+    """
+    The one OpenAI client for the app: a shared keep-alive connection pool, explicit timeouts and
+    bounded retries with jittered exponential backoff on 429/5xx and connection errors
+
+    Pass ``transport`` (any httpx transport, e.g. ``httpx.MockTransport``) or ``base_url`` to run
+    against a stub server instead of the real API. With a ``quota`` (a RateLimiter), every attempt,
+    retries included, is charged to the provider's request and token buckets before it is sent.
+    """
+
+    def __init__(self, api_key=None, base_url=None, transport=None, connect_timeout=5.0, read_timeout=30.0,
+                 max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0, http2=None,
+                 max_retries=3, backoff_base=0.5, backoff_max=8.0, sleep=time.sleep, quota=None, provider=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.quota = quota
+        self.provider = provider or base_url or 'openai'
+        self.transport = transport
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        # HTTP/2 needs h2 (declared via httpx[http2]); if it is missing the pool stays on HTTP/1.1 keep-alive
+        self.http2 = _http2_available() if http2 is None else http2 and _http2_available()
+        if http2 and not self.http2:
+            logging.warning("HTTP/2 requested for the LLM client but h2 is not installed; using HTTP/1.1")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        self._client = None
+        self._lock = threading.Lock()
+        self._usage = {'requests': 0, 'prompt_tokens': 0, 'cached_prompt_tokens': 0,
+                       'completion_tokens': 0, 'latency_ms': 0.0}
+
+    def _timeout(self, read_timeout=None):
+        if read_timeout is None:
+            return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+        read_timeout = max(0.01, read_timeout)
+        return httpx.Timeout(read_timeout, connect=min(self.connect_timeout, read_timeout))
+
+    @property
+    def client(self):
+        """The underlying OpenAI client, created on first use and shared by every thread"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    http_client = httpx.Client(
+                        limits=self.limits,
+                        timeout=self._timeout(),
+                        http2=self.http2,
+                        transport=self.transport
+                    )
+                    # Retries are handled here so they get jitter and a shared policy
+                    self._client = OpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        http_client=http_client,
+                        timeout=self._timeout(),
+                        max_retries=0
+                    )
+        return self._client
+
+    @staticmethod
+    def is_retryable(error):
+        if isinstance(error, APIStatusError):
+            return error.status_code in RETRYABLE_STATUS_CODES
+        # Also covers APITimeoutError
+        return isinstance(error, APIConnectionError)
+
+    @staticmethod
+    def retry_after(error):
+        """Seconds from the response's Retry-After header, or None"""
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
+        try:
+            return float(response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+
+    def retry_delay(self, attempt, error=None):
+        """Full-jitter backoff, but never sooner than a server-provided Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        retry_after = self.retry_after(error)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    @staticmethod
+    def estimate_tokens(messages, max_tokens):
+        """Upper estimate of a request's tokens: the prompt by length plus the whole completion budget"""
+        return sum(len(message.get('content') or '') for message in messages) // CHARS_PER_TOKEN + max_tokens
+
+    def _create(self, timeout=None, charge=0, **params):
+        """
+        Create a completion with retries; ``timeout``, when given, bounds the whole call including
+        retries and backoff, not just one attempt. ``charge`` tokens are debited from the provider
+        quota for each attempt.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if self.quota is not None:
+                max_wait = self.quota.provider_max_wait
+                self.quota.charge_provider(self.provider, charge,
+                                           max_wait=min(max_wait, remaining) if remaining is not None else max_wait)
+                remaining = deadline - time.monotonic() if deadline is not None else None
+            try:
+                return self.client.chat.completions.create(timeout=self._timeout(remaining), **params)
+            except Exception as e:
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    raise
+                delay = self.retry_delay(attempt, e)
+                # A server asking for a longer wait than the backoff budget is better failed over
+                if delay > self.backoff_max or (deadline is not None and time.monotonic() + delay >= deadline):
+                    raise
+                logging.warning(f"LLM request failed ({str(e)}); retry {attempt + 1} in {delay:.2f}s")
+                self._sleep(delay)
+                attempt += 1
+
+    def _record_usage(self, usage, started, charged=0):
+        details = getattr(usage, 'prompt_tokens_details', None) if usage is not None else None
+        if self.quota is not None and usage is not None and usage.total_tokens:
+            # Give back what the estimate over-charged for the attempt that succeeded
+            self.quota.refund_provider(self.provider, charged - usage.total_tokens)
+        with self._lock:
+            self._usage['requests'] += 1
+            self._usage['latency_ms'] += (time.monotonic() - started) * 1000
+            if usage is not None:
+                self._usage['prompt_tokens'] += usage.prompt_tokens or 0
+                self._usage['completion_tokens'] += usage.completion_tokens or 0
+                self._usage['cached_prompt_tokens'] += getattr(details, 'cached_tokens', None) or 0
+
+    def usage_stats(self):
+        """Token usage reported by the API, including prompt tokens served from the provider's prefix cache"""
+        with self._lock:
+            stats = dict(self._usage)
+        requests = stats['requests']
+        stats['avg_prompt_tokens'] = round(stats['prompt_tokens'] / requests, 1) if requests else 0.0
+        stats['avg_latency_ms'] = round(stats['latency_ms'] / requests, 1) if requests else 0.0
+        stats['cached_prompt_ratio'] = (round(stats['cached_prompt_tokens'] / stats['prompt_tokens'], 4)
+                                        if stats['prompt_tokens'] else 0.0)
+        stats['latency_ms'] = round(stats['latency_ms'], 1)
+        return stats
+
+    def chat(self, messages, max_tokens, temperature, model=LLM_MODEL, timeout=None):
+        """Return the stripped text of one chat completion"""
+        started = time.monotonic()
+        charge = self.estimate_tokens(messages, max_tokens)
+        response = self._create(model=model, messages=messages, max_tokens=max_tokens,
+                                temperature=temperature, timeout=timeout, charge=charge)
+        self._record_usage(getattr(response, 'usage', None), started, charge)
+        return response.choices[0].message.content.strip()
+
+    def stream_chat(self, messages, max_tokens, temperature, model=LLM_MODEL, timeout=None):
+        """
+        Yield text deltas of a streamed chat completion
+
+        Only opening the stream is retried; a stream that fails midway raises to the caller.
+        """
+        started = time.monotonic()
+        charge = self.estimate_tokens(messages, max_tokens)
+        stream = self._create(model=model, messages=messages, max_tokens=max_tokens, temperature=temperature,
+                              stream=True, stream_options={'include_usage': True}, timeout=timeout, charge=charge)
+        usage = None
+        for chunk in stream:
+            if getattr(chunk, 'usage', None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+        self._record_usage(usage, started, charge)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+llm_client = LLMClient(
+    api_key=os.environ.get("OPENAI_API_KEY", "your-openai-api-key"),
+    base_url=os.environ.get("LLM_BASE_URL") or None,
+    connect_timeout=float(os.environ.get("LLM_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.environ.get("LLM_TIMEOUT", "30")),
+    max_connections=int(os.environ.get("LLM_POOL_SIZE", "20")),
+    max_keepalive_connections=int(os.environ.get("LLM_POOL_KEEPALIVE", "10")),
+    keepalive_expiry=float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "30")),
+    http2=_env_flag("LLM_HTTP2", "true"),
+    max_retries=int(os.environ.get("LLM_MAX_RETRIES", "3")),
+    backoff_base=float(os.environ.get("LLM_RETRY_BACKOFF", "0.5")),
+    backoff_max=float(os.environ.get("LLM_RETRY_BACKOFF_MAX", "8")),
+    quota=rate_limiter
+)
+atexit.register(llm_client.close)
@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from llm_client import LLMClient, llm_client, LLM_MODEL
+from rate_limit import RateLimitExceeded
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class NoBackendAvailable(Exception):
+    """Raised when every LLM backend failed or has its circuit open"""
+
+
+class BackendHealth:
+    """
+    Rolling latency and error window for one backend, with a circuit breaker
+
+    The circuit opens after ``failure_threshold`` consecutive failures or when the error rate over the
+    window exceeds ``error_rate_threshold``; after ``cooldown`` seconds a single trial request is let
+    through and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, window=100, failure_threshold=5, error_rate_threshold=0.5, min_samples=10, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def available(self):
+        """True if a request could be sent now, without claiming the half-open trial slot"""
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_OPEN and time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            return not self._trial_running
+
+    def allow(self):
+        """True if a request may be sent now; claims the single half-open trial slot"""
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = STATE_HALF_OPEN
+            if self._state == STATE_HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release(self):
+        """Free the half-open trial slot without recording an outcome (the caller gave up)"""
+        with self._lock:
+            self._trial_running = False
+
+    def record(self, success, latency=None):
+        with self._lock:
+            self._outcomes.append(success)
+            self._trial_running = False
+            if success:
+                self._latencies.append(latency)
+                self._consecutive_failures = 0
+                self._state = STATE_CLOSED
+                return
+
+            self._consecutive_failures += 1
+            failures = self._outcomes.count(False)
+            error_rate = failures / len(self._outcomes)
+            if (self._state == STATE_HALF_OPEN
+                    or self._consecutive_failures >= self.failure_threshold
+                    or (len(self._outcomes) >= self.min_samples and error_rate > self.error_rate_threshold)):
+                if self._state != STATE_OPEN:
+                    logging.warning(f"LLM backend circuit opened after {self._consecutive_failures} failures")
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+                self._outcomes.clear()
+
+    def _percentile(self, fraction):
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def latency(self):
+        """Median latency, or None until enough successes were seen"""
+        with self._lock:
+            return self._percentile(0.5)
+
+    def p95(self):
+        with self._lock:
+            return self._percentile(0.95)
+
+    def snapshot(self):
+        with self._lock:
+            outcomes = len(self._outcomes)
+            return {
+                'state': self._state,
+                'requests': outcomes,
+                'error_rate': round(self._outcomes.count(False) / outcomes, 4) if outcomes else 0.0,
+                'p50_ms': round(self._percentile(0.5) * 1000, 1) if self._percentile(0.5) is not None else None,
+                'p95_ms': round(self._percentile(0.95) * 1000, 1) if self._percentile(0.95) is not None else None
+            }
+
+
+class ChatBackend:
+    """An OpenAI model, or any OpenAI-compatible server, reached through an LLMClient"""
+
+    def __init__(self, name, client, model, health=None):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.health = health or BackendHealth()
+
+    def complete(self, messages, max_tokens, temperature, timeout=None):
+        return self.client.chat(messages, max_tokens=max_tokens, temperature=temperature,
+                                model=self.model, timeout=timeout)
+
+    def stream(self, messages, max_tokens, temperature, timeout=None):
+        return self.client.stream_chat(messages, max_tokens=max_tokens, temperature=temperature,
+                                       model=self.model, timeout=timeout)
+
+
+class TemplateBackend:
+    """The template engine as the router's last resort; it renders from the request fields, not messages"""
+
+    name = 'template'
+
+    def __init__(self):
+        self.health = BackendHealth()
+
+    def render(self, render):
+        started = time.monotonic()
+        content = render()
+        self.health.record(True, time.monotonic() - started)
+        return content
+
+
+class LLMRouter:
+    """
+    Sends each completion to the fastest healthy backend and fails over to the next on error
+
+    Backends without enough history keep their configured order. With hedging enabled, a second
+    request goes to the next backend (or the same one if it is the only one) once the primary has
+    run past its p95 latency, and whichever answers first wins.
+    """
+
+    def __init__(self, backends, fallback=None, hedge=False, hedge_min_delay=1.0, max_hedge_workers=16):
+        self.backends = list(backends)
+        self.fallback_backend = fallback or TemplateBackend()
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_hedge_workers, thread_name_prefix='llm-hedge') if hedge else None
+        self._lock = threading.Lock()
+        self._counters = {'requests': 0, 'failovers': 0, 'hedged': 0, 'hedge_wins': 0, 'fallbacks': 0}
+
+    def _bump(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def candidates(self):
+        """Backends accepting requests, fastest first"""
+        ranked = sorted(enumerate(self.backends),
+                        key=lambda item: (item[1].health.latency() is None, item[1].health.latency() or 0, item[0]))
+        return [backend for _, backend in ranked if backend.health.available()]
+
+    def _call(self, backend, messages, max_tokens, temperature, timeout):
+        started = time.monotonic()
+        try:
+            content = backend.complete(messages, max_tokens, temperature, timeout)
+        except RateLimitExceeded:
+            # Our own provider quota, not a backend fault
+            backend.health.release()
+            raise
+        except Exception:
+            backend.health.record(False)
+            raise
+        backend.health.record(True, time.monotonic() - started)
+        return content
+
+    def _hedged_call(self, primary, secondary, messages, max_tokens, temperature, timeout):
+        delay = max(self.hedge_min_delay, primary.health.p95())
+        first = self._executor.submit(self._call, primary, messages, max_tokens, temperature, timeout)
+        pending = {first}
+        done, _ = wait(pending, timeout=delay)
+        if not done and secondary.health.allow():
+            self._bump('hedged')
+            pending.add(self._executor.submit(self._call, secondary, messages, max_tokens, temperature, timeout))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    content = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if future is not first:
+                    self._bump('hedge_wins')
+                # The slower request finishes in the background and still feeds its backend's health
+                return content
+        raise error
+
+    def complete(self, messages, max_tokens, temperature, timeout=None):
+        """
+        Text of one chat completion from the best available LLM backend
+
+        ``timeout`` bounds the whole call: each failover only gets the time that is left.
+        """
+        self._bump('requests')
+        deadline = time.monotonic() + timeout if timeout else None
+        candidates = self.candidates()
+        errors = []
+        for index, backend in enumerate(candidates):
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    errors.append("timed out")
+                    break
+            if not backend.health.allow():
+                continue
+            if errors:
+                self._bump('failovers')
+            try:
+                if self.hedge and backend.health.p95() is not None:
+                    secondary = candidates[index + 1] if index + 1 < len(candidates) else backend
+                    return self._hedged_call(backend, secondary, messages, max_tokens, temperature, timeout)
+                return self._call(backend, messages, max_tokens, temperature, timeout)
+            except RateLimitExceeded:
+                raise
+            except Exception as e:
+                logging.warning(f"LLM backend {backend.name} failed: {str(e)}")
+                errors.append(f"{backend.name}: {str(e)}")
+        raise NoBackendAvailable("; ".join(errors) or "all LLM backends are unavailable")
+
+    def stream(self, messages, max_tokens, temperature, timeout=None):
+        """
+        Yield text deltas from the best available backend
+
+        Failover only happens before the first delta; hedging does not apply to streams.
+        """
+        self._bump('requests')
+        errors = []
+        for backend in self.candidates():
+            if not backend.health.allow():
+                continue
+            if errors:
+                self._bump('failovers')
+            started = time.monotonic()
+            emitted = False
+            try:
+                for delta in backend.stream(messages, max_tokens, temperature, timeout):
+                    emitted = True
+                    yield delta
+            except GeneratorExit:
+                # The client went away; never leave a half-open trial claimed
+                if emitted:
+                    backend.health.record(True, time.monotonic() - started)
+                else:
+                    backend.health.release()
+                raise
+            except RateLimitExceeded:
+                backend.health.release()
+                raise
+            except Exception as e:
+                backend.health.record(False)
+                if emitted:
+                    raise
+                logging.warning(f"LLM backend {backend.name} failed: {str(e)}")
+                errors.append(f"{backend.name}: {str(e)}")
+                continue
+            backend.health.record(True, time.monotonic() - started)
+            return
+        raise NoBackendAvailable("; ".join(errors) or "all LLM backends are unavailable")
+
+    def fallback(self, render):
+        """Render with the template backend once the LLM backends cannot serve a request"""
+        self._bump('fallbacks')
+        return self.fallback_backend.render(render)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['backends'] = {backend.name: backend.health.snapshot()
+                             for backend in self.backends + [self.fallback_backend]}
+        return stats
+
+
+def _health_from_env():
+    return BackendHealth(
+        failure_threshold=int(os.environ.get("LLM_BREAKER_FAILURES", "5")),
+        error_rate_threshold=float(os.environ.get("LLM_BREAKER_ERROR_RATE", "0.5")),
+        cooldown=float(os.environ.get("LLM_BREAKER_COOLDOWN", "30"))
+    )
+
+
+def _build_default_router():
+    """
+    Backends come from LLM_BACKENDS, a JSON list of {"name", "model", "base_url", "api_key"} objects;
+    entries without a base_url share the main OpenAI client and its connection pool
+    """
+    configured = json.loads(os.environ.get("LLM_BACKENDS", "[]") or "[]")
+    if not configured:
+        configured = [{'name': LLM_MODEL, 'model': LLM_MODEL}]
+
+    backends = []
+    for entry in configured:
+        client = llm_client
+        if entry.get('base_url'):
+            client = LLMClient(
+                api_key=entry.get('api_key') or llm_client.api_key,
+                base_url=entry['base_url'],
+                quota=llm_client.quota,
+                connect_timeout=llm_client.connect_timeout,
+                read_timeout=llm_client.read_timeout,
+                max_retries=int(entry.get('max_retries', llm_client.max_retries))
+            )
+        model = entry.get('model', LLM_MODEL)
+        backends.append(ChatBackend(entry.get('name', model), client, model, health=_health_from_env()))
+
+    return LLMRouter(
+        backends,
+        hedge=os.environ.get("LLM_HEDGE", "false").lower() in ("1", "true", "yes"),
+        hedge_min_delay=float(os.environ.get("LLM_HEDGE_MIN_DELAY", "1"))
+    )
+
+
+llm_router = _build_default_router()
@@ -4,8 +4,19 @@ import json
 
 class GeneratedDocument(db.Model):
     __tablename__ = 'generated_documents'
+    __table_args__ = (
+        # Keyset pagination of a session's history, optionally narrowed by category or type;
+        # on PostgreSQL the first index also carries the summary columns for index-only scans
+        db.Index('ix_generated_documents_session_created', 'session_id', 'created_at', 'id',
+                 postgresql_include=['document_type', 'category', 'language', 'sender_name',
+                                     'recipient_name', 'is_demo']),
+        db.Index('ix_generated_documents_session_category_created', 'session_id', 'category', 'created_at', 'id'),
+        db.Index('ix_generated_documents_session_type_created', 'session_id', 'document_type', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
+    # Matches UserSession.session_id; not a foreign key because sessions are upserted in batches
+    session_id = db.Column(db.String(100))
     document_type = db.Column(db.String(100), nullable=False, index=True)
     category = db.Column(db.String(50), nullable=False, index=True)
     language = db.Column(db.String(20), nullable=False, default='english')
@@ -46,14 +57,59 @@ class GeneratedDocument(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
     
+    def to_summary_dict(self):
+        """Summary fields for history listings, without the large content columns"""
+        return {
+            'id': self.id,
+            'document_type': self.document_type,
+            'category': self.category,
+            'language': self.language,
+            'sender_name': self.sender_name,
+            'recipient_name': self.recipient_name,
+            'is_demo': self.is_demo,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
     @property
     def final_content(self):
         """Return edited content if available, otherwise generated content"""
         return self.edited_content if self.edited_content else self.generated_content
 
 
+class DocumentRevision(db.Model):
+    __tablename__ = 'document_revisions'
+    __table_args__ = (
+        db.UniqueConstraint('document_id', 'revision', name='uq_document_revisions_revision'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('generated_documents.id'), nullable=False, index=True)
+    revision = db.Column(db.Integer, nullable=False)  # 1 is the first edit of generated_content
+    diff = db.Column(db.Text)  # JSON line edits against the previous revision
+    snapshot = db.Column(db.Text)  # Full text instead of a diff for checkpoint revisions
+    instruction = db.Column(db.Text)
+    source = db.Column(db.String(20), nullable=False, default='llm')  # llm, cache or manual
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DocumentRevision {self.document_id}.{self.revision}>'
+    
+    def to_dict(self):
+        return {
+            'document_id': self.document_id,
+            'revision': self.revision,
+            'instruction': self.instruction,
+            'source': self.source,
+            'checkpoint': self.snapshot is not None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
 class DocumentStats(db.Model):
     __tablename__ = 'document_stats'
+    __table_args__ = (
+        db.UniqueConstraint('document_type', 'category', 'language', name='uq_document_stats_key'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     document_type = db.Column(db.String(100), nullable=False, index=True)
@@ -79,3 +135,90 @@ class UserSession(db.Model):
     
     def __repr__(self):
         return f'<UserSession {self.session_id}: {self.documents_generated} docs>'
+
+
+class ServerSession(db.Model):
+    __tablename__ = 'server_sessions'
+    
+    sid = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)  # Tagged-JSON session payload
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ServerSession {self.sid[:8]}>'
+
+
+class GenerationLock(db.Model):
+    __tablename__ = 'generation_locks'
+    
+    flight_key = db.Column(db.String(64), primary_key=True)
+    owner = db.Column(db.String(36), nullable=False)
+    result = db.Column(db.Text)  # JSON-encoded result, published by the owner when it finishes
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<GenerationLock {self.flight_key[:12]}: {self.owner}>'
+
+
+class RateLimitBucket(db.Model):
+    __tablename__ = 'rate_limit_buckets'
+    
+    bucket_key = db.Column(db.String(200), primary_key=True)  # "<bucket>:<session id, IP or 'all'>"
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)  # Unix time of the last refill
+    
+    def __repr__(self):
+        return f'<RateLimitBucket {self.bucket_key}: {self.tokens:.1f}>'
+
+
+class CompletionCacheEntry(db.Model):
+    __tablename__ = 'completion_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    model = db.Column(db.String(50), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<CompletionCacheEntry {self.cache_key[:12]}: {self.model}>'
+
+
+class GenerationJob(db.Model):
+    __tablename__ = 'generation_jobs'
+    
+    id = db.Column(db.String(36), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, default='generate', index=True)  # Which queue runs it
+    batch_id = db.Column(db.String(36), index=True)  # Set for rows of a /batch request
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    params = db.Column(db.Text, nullable=False)  # JSON-encoded generation form
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    error = db.Column(db.Text)
+    document_id = db.Column(db.Integer, db.ForeignKey('generated_documents.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    document = db.relationship('GeneratedDocument')
+    
+    def __repr__(self):
+        return f'<GenerationJob {self.id}: {self.status}>'
+    
+    def to_dict(self):
+        """Convert job to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'batch_id': self.batch_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'error': self.error,
+            'document_id': self.document_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,84 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+
+from flask import render_template, session
+
+from catalog import catalog
+from completion_cache import CompletionCache, MemoryCacheTier
+
+
+class PageCache:
+    """
+    Cache of rendered pages that only depend on static catalog data
+
+    Keys combine the template, document type, language and catalog version. Requests with pending
+    flash messages or re-displayed form data always render fresh. Tiers follow the completion cache
+    interface (get/set/clear/name), so a shared tier can be added after the in-process LRU.
+    """
+
+    def __init__(self, tiers):
+        self.cache = CompletionCache(tiers)
+        self._lock = threading.Lock()
+        self._render_ms = {}
+        self._counters = {'bypassed': 0, 'render_ms': 0.0, 'render_ms_saved': 0.0}
+
+    def _key(self, template_name, document_type, language):
+        raw = f"{template_name}|{document_type or ''}|{language or ''}|{catalog.version}"
+        return 'page:' + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def render(self, template_name, document_type=None, language=None, **context):
+        """
+        Render a template through the cache; ``document_type`` and ``language`` are part of both the key
+        and the template context, other context must not vary for a given key
+        """
+        context.update(document_type=document_type, language=language)
+        if session.get('_flashes') or context.get('form_data'):
+            with self._lock:
+                self._counters['bypassed'] += 1
+            return render_template(template_name, **context)
+
+        key = self._key(template_name, document_type, language)
+        html = self.cache.get(key)
+        if html is not None:
+            with self._lock:
+                self._counters['render_ms_saved'] += self._render_ms.get(template_name, 0.0)
+            return html
+
+        started = time.perf_counter()
+        html = render_template(template_name, **context)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.cache.set(key, html, model='page')
+        with self._lock:
+            # Latest miss render time per template is the estimate credited to later hits
+            self._render_ms[template_name] = elapsed_ms
+            self._counters['render_ms'] += elapsed_ms
+        logging.debug(f"Rendered {template_name} in {elapsed_ms:.1f} ms for the page cache")
+        return html
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        """Hit/miss counters plus render time spent on misses and saved by hits"""
+        stats = self.cache.stats()
+        with self._lock:
+            stats.update(self._counters)
+            stats['render_ms_by_template'] = dict(self._render_ms)
+        stats['render_ms'] = round(stats['render_ms'], 2)
+        stats['render_ms_saved'] = round(stats['render_ms_saved'], 2)
+        return stats
+
+
+def _build_default_page_cache():
+    if os.environ.get("PAGE_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return PageCache([])
+    return PageCache([MemoryCacheTier(
+        max_entries=int(os.environ.get("PAGE_CACHE_SIZE", "256")),
+        ttl_seconds=int(os.environ.get("PAGE_CACHE_TTL", "3600"))
+    )])
+
+
+page_cache = _build_default_page_cache()
@@ -0,0 +1,73 @@
+import os
+import glob
+import hashlib
+import logging
+import tempfile
+import threading
+
+from sqlalchemy import event
+
+from models import GeneratedDocument
+from pdf_generator import PDF_LAYOUT_VERSION
+
+
+def pdf_cache_key(document_id, content):
+    """
+    Cache key (also used as the ETag) for a document's rendered PDF
+    """
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+    return f"{document_id}-{digest}-v{PDF_LAYOUT_VERSION}"
+
+
+class PDFCache:
+    """
+    Filesystem store of rendered PDFs, one file per (document id, content hash, layout version)
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get_or_render(self, document_id, content, render):
+        """
+        Return (path, key) for the cached PDF, calling ``render()`` for a BytesIO on a miss
+        """
+        key = pdf_cache_key(document_id, content)
+        path = self.path_for(key)
+        if os.path.exists(path):
+            return path, key
+
+        buffer = render()
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(buffer.getvalue())
+        os.replace(temp_path, path)
+
+        # Drop older renders of this document; the current key may be in use by a concurrent request
+        self.invalidate(document_id, keep=key)
+        return path, key
+
+    def invalidate(self, document_id, keep=None):
+        with self._lock:
+            for path in glob.glob(os.path.join(self.directory, f"{document_id}-*.pdf")):
+                if keep is not None and path == self.path_for(keep):
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logging.warning(f"Could not remove cached PDF {path}: {str(e)}")
+
+
+pdf_cache = PDFCache(os.environ.get("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "typemitr_pdf_cache")))
+
+
+@event.listens_for(GeneratedDocument.edited_content, 'set')
+def _invalidate_on_edit(target, value, oldvalue, initiator):
+    if target.id is not None and value != oldvalue:
+        pdf_cache.invalidate(target.id)
@@ -1,4 +1,7 @@
 import io
+import os
+import logging
+import threading
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -8,90 +11,224 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime
 
-def generate_pdf(letter_data):
+# Bump whenever the PDF layout changes so cached renders are not reused
+PDF_LAYOUT_VERSION = 3
+
+# Budget for a one-page letter, checked by benchmarks/pdf_render.py
+PDF_SIZE_BUDGET_BYTES = 64 * 1024
+PDF_RENDER_BUDGET_MS = 250
+
+FONT_DIR = os.environ.get("PDF_FONT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts"))
+DEVANAGARI_FONT = os.environ.get("PDF_DEVANAGARI_FONT", os.path.join(FONT_DIR, "NotoSansDevanagari-Regular.ttf"))
+DEVANAGARI_BOLD_FONT = os.environ.get("PDF_DEVANAGARI_BOLD_FONT", os.path.join(FONT_DIR, "NotoSansDevanagari-Bold.ttf"))
+
+_font_lock = threading.Lock()
+
+class FontUnavailable(Exception):
+    """Raised when a language's PDF profile cannot be used because its font is not installed"""
+
+def shaping_available():
+    """
+    True if ReportLab can shape complex scripts; that needs the uharfbuzz package
+    """
+    try:
+        import uharfbuzz  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def register_font(font_name, font_path):
+    """
+    Register a TrueType font with ReportLab once per process
+
+    ReportLab embeds TrueType fonts as subsets, so each PDF only carries the glyphs it uses.
+    """
+    with _font_lock:
+        if font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(font_name, font_path))
+    return font_name
+
+class LayoutProfile:
+    """
+    Page size, fonts and paragraph styles built once and shared by every render
+    """
+    def __init__(self, name, pagesize=A4, font_name='Helvetica', bold_font_name='Helvetica-Bold', font_files=None,
+                 shaping=False):
+        self.name = name
+        self.pagesize = pagesize
+        # Complex scripts such as Devanagari need HarfBuzz shaping for conjuncts and vowel signs
+        shaping = 1 if shaping else 0
+
+        # Register custom fonts up front; ReportLab's font registry is process-wide
+        for registered_name, font_path in (font_files or {}).items():
+            register_font(registered_name, font_path)
+
+        self.font_name = font_name
+        self.bold_font_name = bold_font_name
+
+        # Get styles
+        styles = getSampleStyleSheet()
+
+        # Custom styles
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontName=bold_font_name,
+            fontSize=16,
+            spaceAfter=30,
+            alignment=1,  # Center alignment
+            textColor=black,
+            shaping=shaping
+        )
+
+        self.normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontName=font_name,
+            fontSize=11,
+            spaceAfter=12,
+            leading=14,
+            textColor=black,
+            shaping=shaping
+        )
+
+        self.header_style = ParagraphStyle(
+            'CustomHeader',
+            parent=styles['Normal'],
+            fontName=font_name,
+            fontSize=10,
+            spaceAfter=20,
+            alignment=2,  # Right alignment
+            textColor=black,
+            shaping=shaping
+        )
+
+        self.footer_style = ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontName=font_name,
+            fontSize=8,
+            alignment=1,  # Center alignment
+            textColor=black,
+            shaping=shaping
+        )
+
+    def build_story(self, letter_data):
+        """
+        Flow the letter into paragraphs using the prebuilt styles
+        """
+        story = []
+
+        # Header with generation info; the document's own date keeps cached renders identical
+        generated_on = letter_data.get('generated_on') or datetime.now()
+        header_text = f"Generated by Typemitr | {generated_on.strftime('%B %d, %Y')}"
+        story.append(Paragraph(header_text, self.header_style))
+
+        # Title
+        document_type = letter_data.get('document_type', 'Document')
+        story.append(Paragraph(document_type, self.title_style))
+        story.append(Spacer(1, 12))
+
+        # Content
+        content = letter_data.get('content', '')
+
+        # Split content into paragraphs and process
+        paragraphs = content.split('\n\n')
+
+        for para in paragraphs:
+            if para.strip():
+                # Clean up the paragraph
+                clean_para = para.strip().replace('\n', '<br/>')
+                story.append(Paragraph(clean_para, self.normal_style))
+                story.append(Spacer(1, 6))
+
+        # Footer
+        story.append(Spacer(1, 30))
+        footer_text = "Generated by Typemitr - AI-Powered Letter Generator<br/>Made by Atish Gulhane"
+        story.append(Paragraph(footer_text, self.footer_style))
+
+        return story
+
+    def render(self, letter_data, buffer=None):
+        """
+        Render the letter into ``buffer`` (a new BytesIO by default) and return it rewound
+        """
+        buffer = buffer if buffer is not None else io.BytesIO()
+        doc = SimpleDocDocument(buffer, pagesize=self.pagesize)
+        doc.build(self.build_story(letter_data))
+        buffer.seek(0)
+        return buffer
+
+LAYOUT_PROFILES = {}
+
+# Languages that need a profile other than the default one
+LANGUAGE_PROFILES = {}
+
+# Languages that cannot be rendered at all without their profile (the default fonts have no glyphs for them)
+REQUIRED_PROFILES = {'hindi': 'a4-devanagari', 'marathi': 'a4-devanagari'}
+
+DEFAULT_PROFILE = os.environ.get("PDF_DEFAULT_PROFILE", "a4")
+
+def register_layout_profile(profile, languages=()):
+    """
+    Make a profile available by name and, optionally, as the default for some languages
+    """
+    LAYOUT_PROFILES[profile.name] = profile
+    for language in languages:
+        LANGUAGE_PROFILES[language] = profile.name
+    return profile
+
+def get_layout_profile(name=None, language=None):
+    """
+    Look up a profile by name, falling back to the language's profile and then the default
+
+    Raises FontUnavailable for a language whose required profile is not registered, rather than
+    rendering it as missing-glyph boxes in Helvetica.
+    """
+    if name in LAYOUT_PROFILES:
+        return LAYOUT_PROFILES[name]
+    required = REQUIRED_PROFILES.get(language)
+    if required is not None and required not in LAYOUT_PROFILES:
+        raise FontUnavailable(f"{language.title()} PDFs need the {required} layout profile; "
+                              f"install its font as described in fonts/README.md")
+    return LAYOUT_PROFILES[LANGUAGE_PROFILES.get(language, DEFAULT_PROFILE)]
+
+def unavailable_languages():
+    """Languages that cannot be rendered to PDF in this process because their font is missing"""
+    return [language for language, profile in REQUIRED_PROFILES.items() if profile not in LAYOUT_PROFILES]
+
+register_layout_profile(LayoutProfile('a4', pagesize=A4))
+register_layout_profile(LayoutProfile('letter', pagesize=letter))
+
+def _register_devanagari_profile():
+    """
+    Register the Devanagari profile for Hindi and Marathi when the font is available
+    """
+    if not os.path.exists(DEVANAGARI_FONT):
+        logging.error(f"Devanagari font not found at {DEVANAGARI_FONT}; Hindi and Marathi PDFs cannot be rendered "
+                      f"(see fonts/README.md)")
+        return None
+    if not shaping_available():
+        logging.warning("uharfbuzz is not installed; Devanagari conjuncts and vowel signs will not be shaped")
+
+    bold_font = DEVANAGARI_BOLD_FONT if os.path.exists(DEVANAGARI_BOLD_FONT) else DEVANAGARI_FONT
+    return register_layout_profile(LayoutProfile(
+        'a4-devanagari',
+        pagesize=A4,
+        font_name='Devanagari',
+        bold_font_name='Devanagari-Bold',
+        font_files={'Devanagari': DEVANAGARI_FONT, 'Devanagari-Bold': bold_font},
+        shaping=True
+    ), languages=('hindi', 'marathi'))
+
+_register_devanagari_profile()
+
+def generate_pdf(letter_data, profile=None):
     """
     Generate PDF from letter content
     """
-    buffer = io.BytesIO()
-    
-    # Create the PDF document
-    doc = SimpleDocDocument(buffer, pagesize=A4)
-    
-    # Get styles
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30,
-        alignment=1,  # Center alignment
-        textColor=black
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=12,
-        leading=14,
-        textColor=black
-    )
-    
-    header_style = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Normal'],
-        fontSize=10,
-        spaceAfter=20,
-        alignment=2,  # Right alignment
-        textColor=black
-    )
-    
-    # Build the PDF content
-    story = []
-    
-    # Header with generation info
-    header_text = f"Generated by Typemitr | {datetime.now().strftime('%B %d, %Y')}"
-    story.append(Paragraph(header_text, header_style))
-    
-    # Title
-    document_type = letter_data.get('document_type', 'Document')
-    story.append(Paragraph(document_type, title_style))
-    story.append(Spacer(1, 12))
-    
-    # Content
-    content = letter_data.get('content', '')
-    
-    # Split content into paragraphs and process
-    paragraphs = content.split('\n\n')
-    
-    for para in paragraphs:
-        if para.strip():
-            # Clean up the paragraph
-            clean_para = para.strip().replace('\n', '<br/>')
-            story.append(Paragraph(clean_para, normal_style))
-            story.append(Spacer(1, 6))
-    
-    # Footer
-    story.append(Spacer(1, 30))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        alignment=1,  # Center alignment
-        textColor=black
-    )
-    
-    footer_text = "Generated by Typemitr - AI-Powered Letter Generator<br/>Made by Atish Gulhane"
-    story.append(Paragraph(footer_text, footer_style))
-    
-    # Build PDF
-    doc.build(story)
-    
-    # Get the value of the BytesIO buffer and return it
-    buffer.seek(0)
-    return buffer
+    layout = get_layout_profile(profile, letter_data.get('language'))
+    return layout.render(letter_data)
 
 class SimpleDocDocument(SimpleDocTemplate):
     """
@@ -99,7 +236,7 @@ class SimpleDocDocument(SimpleDocTemplate):
     """
     def __init__(self, filename, **kw):
         super().__init__(filename, **kw)
-        
+
         # Set margins
         self.leftMargin = 0.75 * inch
         self.rightMargin = 0.75 * inch
@@ -0,0 +1,143 @@
+import os
+import io
+import multiprocessing
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from pdf_generator import generate_pdf, FontUnavailable
+
+
+def _warm_worker():
+    """
+    Runs once in each worker process: importing pdf_generator builds the layout profiles and
+    registers fonts, and one throwaway render primes ReportLab's caches
+    """
+    generate_pdf({'content': 'Typemitr', 'document_type': 'Warm-up'})
+
+
+def _render_bytes(letter_data, profile=None):
+    return generate_pdf(letter_data, profile).getvalue()
+
+
+def _ping():
+    return os.getpid()
+
+
+class PDFRenderTimeout(Exception):
+    """Raised when a render already running in a worker takes longer than the pool timeout"""
+
+
+class PDFRenderPool:
+    """
+    Optional process pool for ReportLab rendering so concurrent downloads do not serialize on the GIL
+    """
+
+    def __init__(self, workers=0, timeout=30):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers import only the PDF modules, not the Flask app or its threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_warm_worker
+                )
+            return self._executor
+
+    def start(self):
+        """
+        Spawn every worker now, so the first downloads do not pay for process start-up and warm-up
+
+        ProcessPoolExecutor only starts workers as tasks arrive, so one no-op is submitted per worker.
+        """
+        if not self.enabled:
+            return
+        try:
+            executor = self._get_executor()
+            for ping in [executor.submit(_ping) for _ in range(self.workers)]:
+                ping.result(timeout=self.timeout)
+            logging.info(f"PDF render pool started {self.workers} worker(s)")
+        except Exception as e:
+            logging.warning(f"PDF render pool could not start, rendering in-process: {str(e)}")
+            self.shutdown(wait=False)
+
+    def _result(self, future, letter_data, profile):
+        """
+        Wait for a pooled render; on timeout a render still queued is cancelled and done in-process,
+        while one already running is not rendered a second time
+        """
+        try:
+            return io.BytesIO(future.result(timeout=self.timeout))
+        except FutureTimeoutError:
+            if not future.cancel():
+                raise PDFRenderTimeout(f"PDF render took longer than {self.timeout}s")
+            logging.warning(f"PDF render pool busy for {self.timeout}s; rendering in-process")
+        except FontUnavailable:
+            # Not a pool fault: rendering in-process would fail the same way
+            raise
+        except Exception as e:
+            # A broken pool (e.g. a worker was killed) is rebuilt on the next call
+            logging.warning(f"PDF render pool failed, rendering in-process: {str(e)}")
+            self.shutdown(wait=False)
+        return generate_pdf(letter_data, profile)
+
+    def render(self, letter_data, profile=None):
+        """
+        Render a PDF in a worker process, falling back to in-process rendering; returns a BytesIO
+        """
+        if not self.enabled:
+            return generate_pdf(letter_data, profile)
+        try:
+            future = self._get_executor().submit(_render_bytes, letter_data, profile)
+        except Exception as e:
+            logging.warning(f"PDF render pool unavailable, rendering in-process: {str(e)}")
+            self.shutdown(wait=False)
+            return generate_pdf(letter_data, profile)
+        return self._result(future, letter_data, profile)
+
+    def map(self, letters, profile=None):
+        """
+        Render many PDFs, yielding BytesIO objects in input order
+        """
+        if not self.enabled:
+            for letter_data in letters:
+                yield generate_pdf(letter_data, profile)
+            return
+
+        futures = [self._get_executor().submit(_render_bytes, letter_data, profile) for letter_data in letters]
+        try:
+            for letter_data, future in zip(letters, futures):
+                yield self._result(future, letter_data, profile)
+        finally:
+            # Renders nobody will collect (the consumer stopped early or one failed) are dropped
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+pdf_render_pool = PDFRenderPool(
+    workers=int(os.environ.get("PDF_RENDER_WORKERS", "0")),
+    timeout=float(os.environ.get("PDF_RENDER_TIMEOUT", "30"))
+)
+
+
+def render_pdf(letter_data, profile=None):
+    """
+    Render a PDF through the shared pool when it is enabled, otherwise in-process
+    """
+    return pdf_render_pool.render(letter_data, profile)
@@ -0,0 +1,131 @@
+import threading
+from itertools import product
+
+from catalog import catalog
+from token_budget import estimate_tokens
+
+# Identical for every request, so it always forms the start of the cached prompt prefix
+SYSTEM_PROMPT = """You are an expert writer of professional letters, applications and official documents in English, Hindi and Marathi.
+
+For every request:
+1. Produce the complete document, ready to send: sender and recipient details, date, subject, salutation, body, closing and signature line.
+2. Follow the standard format for the requested document type and use language appropriate to it.
+3. Use every detail given and do not invent facts, reference numbers or dates that were not provided.
+4. Keep the requested tone consistently from start to finish.
+5. In Hindi or Marathi, write in Devanagari script and follow formal conventions of that language.
+6. Return only the document text, with blank lines between sections and no commentary."""
+
+LANGUAGE_NAMES = {
+    'english': 'English',
+    'hindi': 'Hindi (Devanagari script)',
+    'marathi': 'Marathi (Devanagari script)'
+}
+
+TONE_DESCRIPTIONS = {
+    'formal': 'very formal and professional',
+    'semi_formal': 'semi-formal and respectful',
+    'friendly': 'friendly yet respectful'
+}
+
+# Request fields in the order they appear in the prompt tail
+DETAIL_LABELS = (
+    ('sender_name', 'From'),
+    ('recipient_name', 'To'),
+    ('purpose', 'Purpose'),
+    ('reason', 'Reason'),
+    ('date_range', 'Dates'),
+    ('additional_details', 'Additional details')
+)
+
+
+def _normalize_tone(tone):
+    tone = (tone or 'formal').replace('-', '_')
+    return tone if tone in TONE_DESCRIPTIONS else 'formal'
+
+
+class CompiledPrompt:
+    """
+    Prompt for one (document type, language, tone): a static prefix built once and a compact tail of request fields
+    """
+
+    def __init__(self, document_type, language, tone):
+        info = catalog.get(document_type) or {}
+        lines = [
+            f"Document type: {document_type}",
+            f"Language: {LANGUAGE_NAMES.get(language, 'English')}",
+            f"Tone: {TONE_DESCRIPTIONS[tone]}"
+        ]
+        if info.get('description'):
+            lines.append(f"About this document: {info['description']}")
+        if info.get('fields'):
+            lines.append("Cover where relevant: " + ", ".join(field.replace('_', ' ') for field in info['fields']))
+        lines.append("")
+        lines.append("Details:")
+
+        self.language = language
+        self.skeleton = "\n".join(lines) + "\n"
+        self.prefix_tokens = round(estimate_tokens(len(SYSTEM_PROMPT) + len(self.skeleton), 'english'))
+
+    def messages(self, **details):
+        tail = "\n".join(f"{label}: {details[field]}" for field, label in DETAIL_LABELS if details.get(field))
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": self.skeleton + tail}
+        ]
+
+    def estimate_tokens(self, messages):
+        """Rough prompt size split into the static prefix and the per-request tail"""
+        tail_length = len(messages[-1]['content']) - len(self.skeleton)
+        return self.prefix_tokens, round(estimate_tokens(tail_length, self.language))
+
+
+class PromptCompiler:
+    """
+    Precompiled prompts for every catalog entry, language and tone; unknown types compile on first use
+    """
+
+    def __init__(self, document_types=()):
+        self._prompts = {}
+        self._lock = threading.Lock()
+        self._counters = {'prompts': 0, 'prefix_tokens': 0, 'tail_tokens': 0}
+        self.precompile(document_types)
+
+    def precompile(self, document_types):
+        compiled = {
+            (document_type, language, tone): CompiledPrompt(document_type, language, tone)
+            for document_type, language, tone in product(document_types, LANGUAGE_NAMES, TONE_DESCRIPTIONS)
+        }
+        with self._lock:
+            self._prompts.update(compiled)
+
+    def get(self, document_type, language, tone):
+        language = language if language in LANGUAGE_NAMES else 'english'
+        key = (document_type, language, _normalize_tone(tone))
+        prompt = self._prompts.get(key)
+        if prompt is None:
+            prompt = CompiledPrompt(*key)
+            with self._lock:
+                self._prompts[key] = prompt
+        return prompt
+
+    def build(self, document_type, language, tone, **details):
+        """Chat messages for one generation request; records the estimated prompt size"""
+        prompt = self.get(document_type, language, tone)
+        messages = prompt.messages(**details)
+        prefix_tokens, tail_tokens = prompt.estimate_tokens(messages)
+        with self._lock:
+            self._counters['prompts'] += 1
+            self._counters['prefix_tokens'] += prefix_tokens
+            self._counters['tail_tokens'] += tail_tokens
+        return messages
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['compiled'] = len(self._prompts)
+        total = stats['prefix_tokens'] + stats['tail_tokens']
+        stats['static_prefix_ratio'] = round(stats['prefix_tokens'] / total, 4) if total else 0.0
+        return stats
+
+
+prompt_compiler = PromptCompiler(catalog.type_names)
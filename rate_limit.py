@@ -0,0 +1,249 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import case, select, update
+
+from upsert import dialect_insert
+
+# Characters per prompt token when estimating a request's size before the provider reports usage
+CHARS_PER_TOKEN = 4
+
+
+def parse_rate(spec):
+    """Parse 'N/SECONDS' into (capacity, refill per second); '0' or '' disables the bucket"""
+    if not spec or spec.strip() == '0':
+        return None
+    amount, _, period = spec.partition('/')
+    capacity = float(amount)
+    return capacity, capacity / float(period or 60)
+
+
+class MemoryBucketStore:
+    """
+    Token buckets in process memory; correct for a single worker only
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, cost, capacity, rate, now):
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                # Least recently used buckets are the fullest ones, so dropping them is harmless
+                self._buckets.popitem(last=False)
+            return allowed, tokens
+
+    def refund(self, key, cost, capacity):
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(capacity, tokens + cost), updated)
+
+
+class DatabaseBucketStore:
+    """
+    Token buckets in the rate_limit_buckets table, shared by every worker
+
+    A take is a single conditional UPDATE that refills and debits in one statement, so concurrent
+    workers cannot overspend a bucket. The engine is resolved once under the app context, so takes
+    also work from threads without one (the router's hedging executor).
+    """
+
+    def __init__(self, engine=None):
+        self._bound_engine = engine
+
+    def _table(self):
+        from models import RateLimitBucket
+        return RateLimitBucket.__table__
+
+    def _engine(self):
+        # Own connections, so rate limiting never commits or rolls back the request's session
+        if self._bound_engine is None:
+            from app import app, db
+            with app.app_context():
+                self._bound_engine = db.engine
+        return self._bound_engine
+
+    def take(self, key, cost, capacity, rate, now):
+        table = self._table()
+        refilled = table.c.tokens + (now - table.c.updated_at) * rate
+        available = case((refilled > capacity, capacity), else_=refilled)
+        engine = self._engine()
+        insert = dialect_insert(engine.dialect.name)
+
+        with engine.begin() as connection:
+            for _ in range(2):
+                result = connection.execute(
+                    update(table)
+                    .where(table.c.bucket_key == key, available >= cost)
+                    .values(tokens=available - cost, updated_at=now)
+                )
+                if result.rowcount == 1:
+                    return True, None
+
+                row = connection.execute(
+                    select(table.c.tokens, table.c.updated_at).where(table.c.bucket_key == key)
+                ).first()
+                if row is not None:
+                    return False, min(capacity, row.tokens + (now - row.updated_at) * rate)
+
+                # First use of this bucket: create it full, then debit it with the update above
+                values = {'bucket_key': key, 'tokens': capacity, 'updated_at': now}
+                if insert is None:
+                    connection.execute(table.insert().values(**values))
+                else:
+                    connection.execute(insert(table).values(**values).on_conflict_do_nothing())
+            return False, None
+
+    def refund(self, key, cost, capacity):
+        table = self._table()
+        with self._engine().begin() as connection:
+            connection.execute(
+                update(table)
+                .where(table.c.bucket_key == key)
+                .values(tokens=case((table.c.tokens + cost > capacity, capacity), else_=table.c.tokens + cost))
+            )
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, bucket, retry_after):
+        super().__init__(f"Rate limit exceeded for {bucket}; retry in {retry_after}s")
+        self.bucket = bucket
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Token buckets per session and per client IP for HTTP requests, plus per-provider buckets for
+    LLM requests and tokens per minute
+
+    A debit takes every applicable bucket or none of them: if a later bucket is empty, earlier debits
+    are refunded and RateLimitExceeded carries the wait until that bucket can pay. Provider buckets
+    are charged by LLMClient for every upstream attempt, so retries, failovers and hedged duplicates
+    all count against the provider quota.
+    """
+
+    def __init__(self, store, session_rate=None, ip_rate=None, global_rpm=None, global_tpm=None,
+                 provider_max_wait=0.0, sleep=time.sleep):
+        self.store = store
+        self.rates = {
+            'session': session_rate,
+            'ip': ip_rate,
+            'global_requests': global_rpm,
+            'global_tokens': global_tpm
+        }
+        self.provider_max_wait = provider_max_wait
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._rejected = {bucket: 0 for bucket in self.rates}
+        self._provider_waits = 0
+
+    def _debit(self, charges):
+        """Take (bucket, identity, cost) charges all or nothing; returns {bucket: tokens left} where known"""
+        now = time.time()
+        taken = []
+        remaining = {}
+        for bucket, identity, cost in charges:
+            rate = self.rates[bucket]
+            if rate is None or identity is None or cost <= 0:
+                continue
+            capacity, refill = rate
+            # Capped so a single large charge can still be paid by a full bucket
+            cost = min(cost, capacity)
+            key = f"{bucket}:{identity}"
+            try:
+                allowed, tokens = self.store.take(key, cost, capacity, refill, now)
+            except Exception as e:
+                # Never turn a rate-limit storage problem into an outage
+                logging.warning(f"Rate limit check failed for {bucket}: {str(e)}")
+                continue
+
+            if not allowed:
+                for taken_key, taken_cost, taken_capacity in taken:
+                    self.store.refund(taken_key, taken_cost, taken_capacity)
+                with self._lock:
+                    self._rejected[bucket] += 1
+                shortfall = cost - (tokens or 0)
+                raise RateLimitExceeded(bucket, max(1, math.ceil(shortfall / refill)))
+
+            taken.append((key, cost, capacity))
+            if tokens is not None:
+                remaining[bucket] = tokens
+        return remaining
+
+    def check(self, session_id, ip):
+        """
+        Debit the session and IP buckets for one HTTP request; returns the session bucket's remaining
+        allowance when known
+        """
+        remaining = self._debit([('session', session_id, 1), ('ip', ip, 1)])
+        return int(remaining['session']) if 'session' in remaining else None
+
+    def charge_provider(self, provider, tokens, max_wait=None):
+        """
+        Debit one upstream request and its estimated tokens from the provider's buckets
+
+        Waits up to ``max_wait`` seconds (provider_max_wait by default) for the buckets to refill, then
+        raises RateLimitExceeded.
+        """
+        max_wait = self.provider_max_wait if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        while True:
+            try:
+                self._debit([('global_requests', provider, 1), ('global_tokens', provider, tokens)])
+                return
+            except RateLimitExceeded as e:
+                if time.monotonic() + e.retry_after > deadline:
+                    raise
+                with self._lock:
+                    self._provider_waits += 1
+                self._sleep(e.retry_after)
+
+    def refund_provider(self, provider, tokens):
+        """Return estimated tokens that the provider reported as unused"""
+        rate = self.rates['global_tokens']
+        if rate is None or tokens <= 0:
+            return
+        try:
+            self.store.refund(f"global_tokens:{provider}", tokens, rate[0])
+        except Exception as e:
+            logging.warning(f"Rate limit refund failed: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            rejected = dict(self._rejected)
+            provider_waits = self._provider_waits
+        return {
+            'limits': {bucket: ({'capacity': rate[0], 'per_second': round(rate[1], 4)} if rate else None)
+                       for bucket, rate in self.rates.items()},
+            'rejected': rejected,
+            'provider_waits': provider_waits
+        }
+
+
+def _build_default_limiter():
+    backend = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+    store = DatabaseBucketStore() if backend == 'database' else MemoryBucketStore()
+    return RateLimiter(
+        store,
+        session_rate=parse_rate(os.environ.get("RATE_LIMIT_SESSION", "10/60")),
+        ip_rate=parse_rate(os.environ.get("RATE_LIMIT_IP", "30/60")),
+        global_rpm=parse_rate(os.environ.get("RATE_LIMIT_GLOBAL_RPM", "400/60")),
+        global_tpm=parse_rate(os.environ.get("RATE_LIMIT_GLOBAL_TPM", "250000/60")),
+        provider_max_wait=float(os.environ.get("RATE_LIMIT_PROVIDER_MAX_WAIT", "5"))
+    )
+
+
+rate_limiter = _build_default_limiter()
@@ -0,0 +1,87 @@
+import os
+import json
+import difflib
+
+REVISION_CHECKPOINT_INTERVAL = int(os.environ.get("REVISION_CHECKPOINT_INTERVAL", "10"))
+REVISION_CHECKPOINT_RATIO = float(os.environ.get("REVISION_CHECKPOINT_RATIO", "0.5"))
+REVISION_HISTORY_LIMIT = int(os.environ.get("REVISION_HISTORY_LIMIT", "50"))
+
+
+def text_lines(text):
+    """Lines with their line endings, so joining them gives back the exact text"""
+    return (text or '').splitlines(keepends=True)
+
+
+def line_delta(old, new):
+    """
+    Edits turning one line list into another as [start, end, replacement lines], with unchanged
+    runs left out
+    """
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    return [[i1, i2, new[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def encode_delta(ops):
+    return json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(lines, ops):
+    result = []
+    position = 0
+    for start, end, replacement in ops:
+        result.extend(lines[position:start])
+        result.extend(replacement)
+        position = end
+    result.extend(lines[position:])
+    return result
+
+
+def replay(base_text, entries):
+    """
+    Text after applying ``entries`` in order to ``base_text``; each entry is (delta JSON, snapshot)
+    and a snapshot, when present, replaces everything before it
+    """
+    lines = text_lines(base_text)
+    for delta, snapshot in entries:
+        lines = text_lines(snapshot) if snapshot is not None else apply_delta(lines, json.loads(delta))
+    return ''.join(lines)
+
+
+class RevisionPolicy:
+    """
+    When a revision is stored as a full checkpoint instead of a delta, and how much history is kept
+
+    Every ``checkpoint_interval``-th revision is a checkpoint, which bounds reconstruction to that
+    many delta replays. A delta that would be larger than ``checkpoint_ratio`` of the full text is
+    stored as a checkpoint too, since it saves little and costs a replay. At most ``history_limit``
+    revisions are kept, counted back from the latest and rounded down to a checkpoint so every kept
+    revision can still be rebuilt; 0 keeps everything.
+    """
+
+    def __init__(self, checkpoint_interval=REVISION_CHECKPOINT_INTERVAL, checkpoint_ratio=REVISION_CHECKPOINT_RATIO,
+                 history_limit=REVISION_HISTORY_LIMIT):
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_ratio = checkpoint_ratio
+        self.history_limit = history_limit
+
+    def encode(self, revision_number, old_text, new_text, force_checkpoint=False):
+        """(delta JSON, None) or (None, full text) for a new revision"""
+        delta = encode_delta(line_delta(text_lines(old_text), text_lines(new_text)))
+        if (force_checkpoint
+                or (self.checkpoint_interval and revision_number % self.checkpoint_interval == 0)
+                or len(delta) > self.checkpoint_ratio * len(new_text)):
+            return None, new_text
+        return delta, None
+
+    def oldest_kept(self, latest_revision, checkpoints):
+        """
+        First revision to keep once ``latest_revision`` is stored, given the checkpoint revision
+        numbers; everything older can be dropped
+        """
+        if not self.history_limit or latest_revision <= self.history_limit:
+            return 1
+        cutoff = latest_revision - self.history_limit + 1
+        return max([revision for revision in checkpoints if revision <= cutoff], default=1)
+
+
+revision_policy = RevisionPolicy()
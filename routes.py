@@ -1,127 +1,38 @@
-from flask import render_template, request, redirect, url_for, flash, session, send_file, jsonify
+from flask import render_template, request, redirect, url_for, flash, session, send_file, jsonify, Response, stream_with_context, after_this_request, abort
 from app import app, db
-from models import GeneratedDocument, DocumentStats, UserSession
-from document_generator import generate_document_content
-from pdf_generator import generate_pdf
-import io
+from models import GeneratedDocument, GenerationJob, DocumentRevision
+from document_generator import generate_document_content, stream_document_content
+from pdf_pool import render_pdf, pdf_render_pool
+from pdf_generator import FontUnavailable, unavailable_languages
+from pdf_cache import pdf_cache
+from job_queue import create_job_queue, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED
+from template_engine import date_range_label, is_demo_content
+from batch_generator import (parse_batch_rows, batch_job_params, batch_row_kwargs, generate_batch_row, save_batch_row,
+                             BatchValidationError, BATCH_CONCURRENCY)
+from session_tracker import session_tracker
+from history_service import list_history, InvalidCursor, HISTORY_FILTERS, HISTORY_PAGE_SIZE
+from search_service import ensure_search_index, search_documents, SEARCH_PAGE_SIZE
+from stats_service import stats_aggregator, popular_document_types
+from page_cache import page_cache
+from llm_client import llm_client
+from llm_router import llm_router
+from singleflight import single_flight, flight_key
+from rate_limit import rate_limiter, RateLimitExceeded
+from prompt_templates import prompt_compiler
+from completion_cache import completion_cache
+from catalog import catalog, CATALOG_CACHE_CONTROL, CATALOG_REVALIDATE_CACHE_CONTROL
+from document_edits import (improve_document, record_revision, revision_content, revision_storage, latest_revision_number,
+                            RevisionConflict)
+from export_service import stream_zip_export, stream_merged_pdf_export
+import atexit
+import hmac
+import os
+import json
 import uuid
 from datetime import datetime
 
-# Document categories and types based on uploaded files
-DOCUMENT_CATEGORIES = {
-    'academic': {
-        'name': 'Academic & Educational',
-        'icon': '🎓',
-        'types': [
-            'University/College Admission Application',
-            'Scholarship/Financial Aid Application',
-            'Bonafide Certificate Application',
-            'Migration Certificate Application',
-            'Character Certificate Application (School/College)',
-            'Provisional Certificate Application',
-            'Degree Certificate Application',
-            'No Dues Certificate Application (College/Hostel)',
-            'Change of Name Application (Academic Records)',
-            'Re-evaluation/Re-checking Application (Exams)',
-            'Duplicate Marksheet/Certificate Application',
-            'Withdrawal Application (from course, college)',
-            'Application for Inter-College Transfer',
-            'Application for Leave of Absence (Academic)',
-            'Application for Readmission',
-            'Application for Industrial Training/Internship',
-            'Application for Campus Placement',
-            'Request for Academic Records/Transcript'
-        ]
-    },
-    'corporate': {
-        'name': 'Corporate & Business',
-        'icon': '💼',
-        'types': [
-            'Job Application (Private Sector)',
-            'Business Proposal Application',
-            'Vendor/Supplier Application',
-            'Franchise Application',
-            'Tender Application (Private Sector Procurement)',
-            'Expression of Interest (EOI) Application',
-            'Partnership/Joint Venture Application',
-            'Vendor Empanelment Application',
-            'Dealer/Distributor Application',
-            'Client Onboarding Application',
-            'Application for Company Registration/Incorporation',
-            'Application for Statutory Licenses',
-            'Application for Tax Registration',
-            'Application for Tax Refund (Corporate)',
-            'Application for Environmental Clearances (Industrial)',
-            'Application for Factory License',
-            'Application for Export/Import Code (IEC)',
-            'Request for Quotation/Proposal (RFQ/RFP)'
-        ]
-    },
-    'government': {
-        'name': 'Government & Public Service',
-        'icon': '🏛️',
-        'types': [
-            'Aadhaar Card Application/Update/Correction',
-            'PAN Card Application/Correction',
-            'Passport Application',
-            'Voter ID Application',
-            'Birth Certificate Application/Correction',
-            'Death Certificate Application/Correction',
-            'Marriage Registration Application',
-            'Domicile Certificate Application',
-            'Caste Certificate Application',
-            'Income Certificate Application',
-            'Character Certificate Application (Police Clearance)',
-            'Ration Card Application',
-            'Driving License Application',
-            'Vehicle Registration/Transfer Application',
-            'Building Permit Application',
-            'Trade License Application',
-            'Right to Information (RTI) Application',
-            'Public Grievance Application',
-            'Property Registration Application',
-            'Utility Connection Application'
-        ]
-    },
-    'legal': {
-        'name': 'Court & Judicial',
-        'icon': '⚖️',
-        'types': [
-            'Writ Petition',
-            'Divorce Petition',
-            'Guardianship Petition',
-            'Bail Application',
-            'Application for Stay of Proceedings',
-            'Application for Adjournment',
-            'Application for Condonation of Delay',
-            'Application for Amendment',
-            'Application for Execution of Decree',
-            'Application for Contempt of Court Proceedings',
-            'Application for Review/Revision of Order',
-            'Application for Transfer of Case',
-            'Application for Maintenance',
-            'Application for Interim Injunction',
-            'Habeas Corpus Petition',
-            'Mandamus Petition',
-            'Consumer Complaint Application'
-        ]
-    },
-    'general': {
-        'name': 'General Applications',
-        'icon': '📝',
-        'types': [
-            'Leave Application',
-            'Refund/Reimbursement Application',
-            'Club/Society Membership Application',
-            'Volunteer Application',
-            'Event Registration Application',
-            'Pet Adoption Application',
-            'Contest/Competition Entry Application',
-            'Complaint Application/Form',
-            'Request for Permission'
-        ]
-    }
-}
+with app.app_context():
+    ensure_search_index()
 
 LANGUAGES = {
     'english': 'English',
@@ -135,161 +46,645 @@ TONES = {
     'friendly': 'Friendly'
 }
 
+def _current_session_id():
+    """Return this browser's session id, creating one if needed"""
+    if 'session_id' not in session:
+        session['session_id'] = str(uuid.uuid4())
+    return session['session_id']
+
 @app.route('/')
 def index():
     # Initialize or update user session
-    if 'session_id' not in session:
-        session['session_id'] = str(uuid.uuid4())
+    _current_session_id()
         
-    # Get or create user session in database
-    user_session = UserSession.query.filter_by(session_id=session['session_id']).first()
-    if not user_session:
-        user_session = UserSession(session_id=session['session_id'])
-        db.session.add(user_session)
-        db.session.commit()
-    else:
-        user_session.last_activity = datetime.utcnow()
-        db.session.commit()
+    # Record activity; the tracker upserts user_sessions in batches off the request path
+    session_tracker.touch(session['session_id'])
     
-    return render_template('index.html', 
-                         categories=DOCUMENT_CATEGORIES,
+    return page_cache.render('index.html',
+                         language=request.args.get('language') if request.args.get('language') in LANGUAGES else None,
+                         categories=catalog.categories,
+                         catalog_fragment=catalog.index_fragment(),
+                         catalog_version=catalog.version,
                          languages=LANGUAGES,
                          tones=TONES)
 
-@app.route('/generate', methods=['POST'])
+def _read_generation_form():
+    """Read and validate the generation form, returning None if required fields are missing"""
+    form = {
+        'category': request.form.get('category'),
+        'document_type': request.form.get('document_type'),
+        'language': request.form.get('language'),
+        'tone': request.form.get('tone'),
+        'sender_name': request.form.get('sender_name'),
+        'recipient_name': request.form.get('recipient_name'),
+        'purpose': request.form.get('purpose'),
+        'reason': request.form.get('reason', ''),
+        'mode': request.form.get('generation_mode'),
+        'session_id': _current_session_id(),
+        'date_from': None,
+        'date_to': None
+    }
+    
+    # Validate required fields
+    required = ['category', 'document_type', 'language', 'tone', 'sender_name', 'recipient_name', 'purpose']
+    if not all(form[field] for field in required):
+        return None
+    
+    # Parse dates
+    date_from_str = request.form.get('date_from')
+    date_to_str = request.form.get('date_to')
+    if date_from_str:
+        form['date_from'] = datetime.strptime(date_from_str, '%Y-%m-%d').date()
+    if date_to_str:
+        form['date_to'] = datetime.strptime(date_to_str, '%Y-%m-%d').date()
+    
+    return form
+
+def _generation_kwargs(form):
+    """Arguments for the document generator taken from a parsed form"""
+    return {
+        'document_type': form['document_type'],
+        'language': form['language'],
+        'tone': form['tone'],
+        'sender_name': form['sender_name'],
+        'recipient_name': form['recipient_name'],
+        'purpose': form['purpose'],
+        'reason': form['reason'],
+        'date_from': form['date_from'],
+        'date_to': form['date_to'],
+        'mode': form.get('mode')
+    }
+
+def _normalized_request(form):
+    """Generation parameters with whitespace collapsed, identifying duplicate submissions from one session"""
+    normalized = {key: " ".join(value.split()) if isinstance(value, str) else value
+                  for key, value in _generation_kwargs(form).items()}
+    normalized['category'] = form['category']
+    normalized['session_id'] = form.get('session_id')
+    return normalized
+
+def _save_generated_document(form, generated_content):
+    """Persist a generated document and return the saved row"""
+    date_from = form['date_from']
+    date_to = form['date_to']
+    
+    date_range = date_range_label(date_from, date_to)
+    
+    # Check if this was generated in demo mode (based on content pattern)
+    is_demo = is_demo_content(generated_content)
+    
+    # Save to database
+    document = GeneratedDocument(
+        document_type=form['document_type'],
+        category=form['category'],
+        language=form['language'],
+        tone=form['tone'],
+        sender_name=form['sender_name'],
+        recipient_name=form['recipient_name'],
+        purpose=form['purpose'],
+        reason=form['reason'],
+        date_range=date_range,
+        generated_content=generated_content,
+        is_demo=is_demo,
+        session_id=form.get('session_id')
+    )
+    
+    db.session.add(document)
+    db.session.commit()
+    
+    stats_aggregator.record(document.document_type, document.category, document.language)
+    return document
+
+def _rate_limited_response(error, html=False):
+    """429 response for an empty session, IP or provider bucket, with Retry-After"""
+    app.logger.warning(f"Rate limited {request.remote_addr} on {request.path}: {error.bucket}")
+    message = f'Too many requests. Please try again in {error.retry_after} seconds.'
+    if html:
+        flash(message, 'error')
+        response = app.make_response((render_template('index.html',
+                                                      categories=catalog.categories,
+                                                      languages=LANGUAGES,
+                                                      tones=TONES), 429))
+    else:
+        response = jsonify({'error': message, 'retry_after': error.retry_after})
+        response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def _rate_limit(html=False):
+    """
+    Debit the session and IP buckets; returns a 429 response if either is empty
+
+    Provider quotas are charged by the LLM client for each upstream call, not here.
+    """
+    try:
+        remaining = rate_limiter.check(_current_session_id(), request.remote_addr)
+    except RateLimitExceeded as e:
+        return _rate_limited_response(e, html=html)
+    
+    if remaining is not None:
+        @after_this_request
+        def add_remaining(response):
+            response.headers['X-RateLimit-Remaining'] = str(remaining)
+            return response
+    return None
+
+def _sse_event(event, data):
+    """Format a server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/generate', methods=['GET', 'POST'])
 def generate():
+    if request.method == 'GET':
+        document_type = request.args.get('type')
+        if not document_type or document_type not in catalog:
+            flash('Invalid document type selected.', 'error')
+            return redirect(url_for('index'))
+        
+        return page_cache.render('generate.html',
+                                 document_type=document_type,
+                                 document_info=catalog.get(document_type),
+                                 categories=catalog.categories,
+                                 languages=LANGUAGES,
+                                 tones=TONES)
+    
     try:
         # Get form data
-        category = request.form.get('category')
-        document_type = request.form.get('document_type')
-        language = request.form.get('language')
-        tone = request.form.get('tone')
-        sender_name = request.form.get('sender_name')
-        recipient_name = request.form.get('recipient_name')
-        purpose = request.form.get('purpose')
-        reason = request.form.get('reason', '')
-        date_from_str = request.form.get('date_from')
-        date_to_str = request.form.get('date_to')
-        
-        # Validate required fields
-        if not all([category, document_type, language, tone, sender_name, recipient_name, purpose]):
+        form = _read_generation_form()
+        if form is None:
             flash('Please fill in all required fields.', 'error')
             return redirect(url_for('index'))
         
-        # Parse dates
-        date_from = None
-        date_to = None
-        if date_from_str:
-            date_from = datetime.strptime(date_from_str, '%Y-%m-%d').date()
-        if date_to_str:
-            date_to = datetime.strptime(date_to_str, '%Y-%m-%d').date()
-        
-        # Generate document content using AI
-        generated_content = generate_document_content(
-            document_type=document_type,
-            language=language,
-            tone=tone,
-            sender_name=sender_name,
-            recipient_name=recipient_name,
-            purpose=purpose,
-            reason=reason,
-            date_from=date_from,
-            date_to=date_to
-        )
-        
-        # Create date range string
-        date_range = None
-        if date_from and date_to:
-            date_range = f"{date_from} to {date_to}"
-        elif date_from:
-            date_range = f"From {date_from}"
-        elif date_to:
-            date_range = f"Until {date_to}"
+        limited = _rate_limit(html=True)
+        if limited is not None:
+            return limited
         
-        # Check if this was generated in demo mode (based on content pattern)
-        is_demo = "demo" in generated_content.lower() or "sample" in generated_content.lower()
+        # Identical concurrent submissions (e.g. a double-click) share one generation and one saved row
+        def generate_and_save():
+            content = generate_document_content(**_generation_kwargs(form))
+            return _save_generated_document(form, content).id
         
-        # Save to database
-        document = GeneratedDocument(
-            document_type=document_type,
-            category=category,
-            language=language,
-            tone=tone,
-            sender_name=sender_name,
-            recipient_name=recipient_name,
-            purpose=purpose,
-            reason=reason,
-            date_range=date_range,
-            generated_content=generated_content,
-            is_demo=is_demo
-        )
+        document_id = single_flight.do(flight_key('document', _normalized_request(form)), generate_and_save)
+        document = db.session.get(GeneratedDocument, document_id)
+        generated_content = document.generated_content
         
-        db.session.add(document)
-        db.session.commit()
-        
-        # Store in session for display
-        session['generated_document'] = {
-            'id': document.id,
-            'content': generated_content,
-            'document_type': document_type,
-            'sender_name': sender_name,
-            'recipient_name': recipient_name
-        }
+        # Only the id goes in the session; the content is already persisted with the document
+        session['generated_document_id'] = document.id
         
         return render_template('generate.html', 
-                             document=session['generated_document'],
-                             categories=DOCUMENT_CATEGORIES,
+                             document={
+                                 'id': document.id,
+                                 'content': generated_content,
+                                 'document_type': document.document_type,
+                                 'language': document.language,
+                                 'sender_name': document.sender_name,
+                                 'recipient_name': document.recipient_name
+                             },
+                             categories=catalog.categories,
                              languages=LANGUAGES,
                              tones=TONES)
         
+    except RateLimitExceeded as e:
+        return _rate_limited_response(e, html=True)
     except Exception as e:
         app.logger.error(f"Error generating document: {str(e)}")
         flash(f'Error generating document: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+@app.route('/generate_stream', methods=['POST'])
+def generate_stream():
+    """Stream a generated document to the browser as server-sent events"""
+    try:
+        form = _read_generation_form()
+    except ValueError:
+        form = None
+    if form is None:
+        return jsonify({'error': 'Please fill in all required fields.'}), 400
+    
+    limited = _rate_limit()
+    if limited is not None:
+        return limited
+    
+    def event_stream():
+        parts = []
+        try:
+            for delta in stream_document_content(**_generation_kwargs(form)):
+                parts.append(delta)
+                yield _sse_event('token', {'text': delta})
+            
+            # Persist once the full completion has arrived
+            document = _save_generated_document(form, "".join(parts).strip())
+            yield _sse_event('done', {
+                'id': document.id,
+                'download_url': url_for('download_pdf', document_id=document.id)
+            })
+        except RateLimitExceeded as e:
+            # Headers are already sent, so the client gets the wait in the error event
+            app.logger.warning(f"Rate limited stream for {request.remote_addr}: {e.bucket}")
+            yield _sse_event('error', {'message': f'Too many requests. Please try again in {e.retry_after} seconds.',
+                                       'retry_after': e.retry_after})
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Error streaming document: {str(e)}")
+            yield _sse_event('error', {'message': f'Error generating document: {str(e)}'})
+    
+    response = Response(stream_with_context(event_stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+job_queue = create_job_queue(app, generate_document_content, _save_generated_document, kwargs_for=_generation_kwargs)
+atexit.register(job_queue.shutdown)
+batch_queue = create_job_queue(app, generate_batch_row, save_batch_row, kwargs_for=batch_row_kwargs,
+                               kind='batch', workers=BATCH_CONCURRENCY)
+atexit.register(batch_queue.shutdown)
+pdf_render_pool.start()
+atexit.register(pdf_render_pool.shutdown)
+
+@app.route('/jobs', methods=['POST'])
+def enqueue_job():
+    """Queue a document generation job and return its status URL"""
+    try:
+        form = _read_generation_form()
+    except ValueError:
+        form = None
+    if form is None:
+        return jsonify({'error': 'Please fill in all required fields.'}), 400
+    
+    limited = _rate_limit()
+    if limited is not None:
+        return limited
+    
+    job = job_queue.enqueue(form)
+    response = jsonify({**job.to_dict(), 'status_url': url_for('job_status', job_id=job.id)})
+    response.status_code = 202
+    response.headers['Location'] = url_for('job_status', job_id=job.id)
+    return response
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Return the status of a generation job, including the document once it has succeeded"""
+    job = db.get_or_404(GenerationJob, job_id)
+    payload = job.to_dict()
+    if job.document is not None:
+        payload['document'] = {
+            'id': job.document.id,
+            'content': job.document.final_content,
+            'download_url': url_for('download_pdf', document_id=job.document.id)
+        }
+    return jsonify(payload)
+
+@app.route('/batch', methods=['POST'])
+def generate_batch_documents():
+    """Queue many letters from a JSON list or CSV upload; poll the status URL, then download a zip of PDFs"""
+    try:
+        if 'file' in request.files:
+            rows = parse_batch_rows(csv_file=request.files['file'].stream, defaults=request.form.to_dict())
+        else:
+            rows = parse_batch_rows(payload=request.get_json(silent=True))
+    except BatchValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    limited = _rate_limit()
+    if limited is not None:
+        return limited
+    
+    batch_id = str(uuid.uuid4())
+    batch_queue.enqueue_many(batch_job_params(rows, session_id=_current_session_id()), batch_id=batch_id)
+    app.logger.info(f"Batch {batch_id} queued with {len(rows)} rows")
+    
+    response = jsonify({
+        'batch_id': batch_id,
+        'rows': len(rows),
+        'status_url': url_for('batch_status', batch_id=batch_id),
+        'download_url': url_for('download_batch', batch_id=batch_id)
+    })
+    response.status_code = 202
+    response.headers['Location'] = url_for('batch_status', batch_id=batch_id)
+    return response
+
+def _batch_jobs_or_404(batch_id):
+    """The batch's jobs in row order, if the batch belongs to this session (any batch for admins)"""
+    jobs = GenerationJob.query.filter_by(kind='batch', batch_id=batch_id).all()
+    if not jobs:
+        abort(404)
+    params = {job.id: json.loads(job.params) for job in jobs}
+    if params[jobs[0].id].get('session_id') != session.get('session_id') and not _is_admin_request():
+        abort(404)
+    return sorted(((params[job.id]['row'], job) for job in jobs), key=lambda item: item[0])
+
+def _font_unavailable_response(message):
+    app.logger.error(f"PDF font missing on {request.path}: {message}")
+    return jsonify({'error': message}), 503
+
+def _unrenderable_export(query):
+    """503 response if the export includes documents in a language whose PDF font is not installed"""
+    missing = unavailable_languages()
+    if missing and db.session.query(query.filter(GeneratedDocument.language.in_(missing)).exists()).scalar():
+        return _font_unavailable_response(f"PDFs in {', '.join(language.title() for language in missing)} "
+                                          f"cannot be rendered: the font is not installed (see fonts/README.md)")
+    return None
+
+def _batch_errors(jobs):
+    return [{'row': row, 'error': job.error} for row, job in jobs if job.status == JOB_FAILED]
+
+@app.route('/batch/<batch_id>')
+def batch_status(batch_id):
+    """Progress of a queued batch, with the rows that failed"""
+    jobs = _batch_jobs_or_404(batch_id)
+    counts = {status: 0 for status in (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED)}
+    for _, job in jobs:
+        counts[job.status] += 1
+    
+    return jsonify({
+        'batch_id': batch_id,
+        'rows': len(jobs),
+        **counts,
+        'finished': counts[JOB_QUEUED] + counts[JOB_RUNNING] == 0,
+        'errors': _batch_errors(jobs),
+        'download_url': url_for('download_batch', batch_id=batch_id)
+    })
+
+@app.route('/batch/<batch_id>/download')
+def download_batch(batch_id):
+    """Stream the zip of PDFs for a finished batch, with errors.json listing failed rows"""
+    jobs = _batch_jobs_or_404(batch_id)
+    if any(job.status in (JOB_QUEUED, JOB_RUNNING) for _, job in jobs):
+        return jsonify({'error': 'Batch is still running.',
+                        'status_url': url_for('batch_status', batch_id=batch_id)}), 409
+    
+    document_ids = [job.document_id for _, job in jobs if job.document_id is not None]
+    errors = _batch_errors(jobs)
+    extra_files = {'errors.json': json.dumps(errors, ensure_ascii=False, indent=2).encode('utf-8')} if errors else None
+    query = GeneratedDocument.query.filter(GeneratedDocument.id.in_(document_ids))
+    unrenderable = _unrenderable_export(query)
+    if unrenderable is not None:
+        return unrenderable
+    
+    return Response(
+        stream_with_context(stream_zip_export(query, extra_files=extra_files)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="typemitr_batch_{batch_id[:8]}.zip"'}
+    )
+
+@app.route('/download-pdf')
+def download_generated_pdf():
+    """PDF of the document generated last in this session"""
+    document_id = session.get('generated_document_id')
+    if document_id is None:
+        flash('No letter found. Please generate a letter first.', 'error')
+        return redirect(url_for('index'))
+    return redirect(url_for('download_pdf', document_id=document_id))
+
 @app.route('/download_pdf/<int:document_id>')
 def download_pdf(document_id):
     try:
         document = GeneratedDocument.query.get_or_404(document_id)
+        content = document.final_content
         
-        # Generate PDF
-        pdf_buffer = generate_pdf({
-            'content': document.final_content,
+        # Render only when this content/layout has not been rendered before
+        pdf_path, etag = pdf_cache.get_or_render(document.id, content, lambda: render_pdf({
+            'content': content,
             'document_type': document.document_type,
+            'language': document.language,
             'sender_name': document.sender_name,
-            'recipient_name': document.recipient_name
-        })
+            'recipient_name': document.recipient_name,
+            'generated_on': document.created_at
+        }))
         
         return send_file(
-            pdf_buffer,
+            pdf_path,
             as_attachment=True,
             download_name=f"{document.document_type}_{document.id}.pdf",
-            mimetype='application/pdf'
+            mimetype='application/pdf',
+            conditional=True,
+            etag=etag,
+            max_age=0
         )
         
+    except FontUnavailable as e:
+        return _font_unavailable_response(str(e))
     except Exception as e:
         app.logger.error(f"Error generating PDF: {str(e)}")
         flash('Error generating PDF', 'error')
         return redirect(url_for('index'))
-        
-        # Create filename
-        filename = f"{document.document_type.replace('/', '_').replace(' ', '_')}_{document.sender_name.replace(' ', '_')}.pdf"
-        
-        return send_file(
-            pdf_buffer,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/pdf'
-        )
-        
+
+def _is_admin_request():
+    """True when the request carries the configured ADMIN_TOKEN"""
+    admin_token = os.environ.get("ADMIN_TOKEN")
+    supplied = request.headers.get('X-Admin-Token') or request.args.get('token')
+    return bool(admin_token) and supplied is not None and hmac.compare_digest(admin_token, supplied)
+
+def _owned_document_or_404(document_id):
+    """The document if it belongs to this session (any document for admins), otherwise 404"""
+    document = db.get_or_404(GeneratedDocument, document_id)
+    if document.session_id != session.get('session_id') and not _is_admin_request():
+        abort(404)
+    return document
+
+@app.route('/documents/<int:document_id>/improve', methods=['POST'])
+def improve_document_text(document_id):
+    """Apply an improvement request to a document as paragraph-level edits"""
+    payload = request.get_json(silent=True) or request.form
+    instruction = (payload.get('request') or '').strip()
+    if not instruction:
+        return jsonify({'error': 'Please describe the improvement.'}), 400
+    
+    document = _owned_document_or_404(document_id)
+    limited = _rate_limit()
+    if limited is not None:
+        return limited
+    
+    try:
+        revision, paragraphs_sent = improve_document(document, instruction)
+    except RevisionConflict as e:
+        app.logger.warning(f"Conflicting edit of document {document_id}: {str(e)}")
+        return jsonify({'error': 'The document was changed by another save. Please reload and try again.'}), 409
+    except RateLimitExceeded as e:
+        db.session.rollback()
+        return _rate_limited_response(e)
     except Exception as e:
-        app.logger.error(f"Error generating PDF: {str(e)}")
-        flash(f'Error generating PDF: {str(e)}', 'error')
-        return redirect(url_for('index'))
+        db.session.rollback()
+        app.logger.error(f"Error improving document {document_id}: {str(e)}")
+        return jsonify({'error': f'Error improving document: {str(e)}'}), 502
+    
+    return jsonify({
+        'id': document.id,
+        'content': document.final_content,
+        'changed': revision is not None,
+        'revision': revision.revision if revision else latest_revision_number(document.id),
+        'paragraphs_sent': paragraphs_sent,
+        'download_url': url_for('download_pdf', document_id=document.id)
+    })
+
+@app.route('/documents/<int:document_id>/content', methods=['PUT', 'POST'])
+def save_document_content(document_id):
+    """Save the user's edited text as a new revision"""
+    payload = request.get_json(silent=True) or request.form
+    content = payload.get('content')
+    if not isinstance(content, str) or not content.strip():
+        return jsonify({'error': 'Document content cannot be empty.'}), 400
+    
+    document = _owned_document_or_404(document_id)
+    try:
+        revision = record_revision(document, content, source='manual')
+    except RevisionConflict as e:
+        app.logger.warning(f"Conflicting save of document {document_id}: {str(e)}")
+        return jsonify({'error': 'The document was changed by another save. Please reload and try again.'}), 409
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error saving document {document_id}: {str(e)}")
+        return jsonify({'error': f'Error saving document: {str(e)}'}), 500
+    
+    return jsonify({
+        'id': document.id,
+        'changed': revision is not None,
+        'revision': revision.revision if revision else latest_revision_number(document.id),
+        'download_url': url_for('download_pdf', document_id=document.id)
+    })
+
+@app.route('/documents/<int:document_id>/revisions')
+def document_revisions(document_id):
+    """List a document's revisions, or return the text of one with ?revision=N"""
+    document = _owned_document_or_404(document_id)
+    revision_number = request.args.get('revision', type=int)
+    if revision_number is not None:
+        content = revision_content(document, revision_number)
+        if content is None:
+            abort(404)
+        return jsonify({
+            'id': document.id,
+            'revision': revision_number,
+            'content': content
+        })
+    
+    revisions = (DocumentRevision.query
+                 .filter_by(document_id=document.id)
+                 .order_by(DocumentRevision.revision)
+                 .all())
+    return jsonify({
+        'id': document.id,
+        'revisions': [revision.to_dict() for revision in revisions],
+        'storage': revision_storage(document.id)
+    })
+
+@app.route('/export')
+def export_documents():
+    """Stream generated documents as a ZIP of PDFs or as one merged PDF"""
+    export_format = request.args.get('format', 'zip')
+    if export_format not in ('zip', 'pdf'):
+        return jsonify({'error': 'Format must be zip or pdf.'}), 400
+    
+    # Admins export everything; everyone else exports their own session's history
+    query = GeneratedDocument.query
+    if not _is_admin_request():
+        if 'session_id' not in session:
+            return jsonify({'error': 'No documents match this export.'}), 404
+        query = query.filter(GeneratedDocument.session_id == session['session_id'])
+    for field in ('category', 'language', 'document_type'):
+        value = request.args.get(field)
+        if value:
+            query = query.filter(getattr(GeneratedDocument, field) == value)
+    
+    if not db.session.query(query.exists()).scalar():
+        return jsonify({'error': 'No documents match this export.'}), 404
+    unrenderable = _unrenderable_export(query)
+    if unrenderable is not None:
+        return unrenderable
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if export_format == 'zip':
+        body = stream_zip_export(query)
+        mimetype = 'application/zip'
+    else:
+        body = stream_merged_pdf_export(query)
+        mimetype = 'application/pdf'
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="typemitr_export_{timestamp}.{export_format}"'}
+    )
+
+@app.route('/history')
+def history():
+    """This session's documents as JSON, newest first, with keyset pagination"""
+    filters = {field: request.args.get(field) for field in HISTORY_FILTERS}
+    try:
+        documents, next_cursor = list_history(
+            _current_session_id(),
+            filters=filters,
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', HISTORY_PAGE_SIZE, type=int)
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor.'}), 400
+    
+    return jsonify({
+        'documents': [document.to_summary_dict() for document in documents],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/search')
+def search():
+    """Ranked full-text search as JSON over this session's documents (or all documents for admins)"""
+    query_text = request.args.get('q', '').strip()
+    session_id = None if _is_admin_request() else _current_session_id()
+    limit = request.args.get('limit', SEARCH_PAGE_SIZE, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    
+    results = search_documents(query_text, session_id=session_id, limit=limit, offset=offset) if query_text else []
+    
+    return jsonify({
+        'query': query_text,
+        'results': [{**document.to_summary_dict(), 'rank': rank} for document, rank in results]
+    })
+
+@app.route('/stats/popular')
+def popular_types():
+    """Most generated document types, served from the document_stats aggregates"""
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    return jsonify(popular_document_types(
+        limit=limit,
+        category=request.args.get('category'),
+        language=request.args.get('language')
+    ))
+
+@app.route('/stats/cache')
+def cache_stats():
+    """Hit rates of the completion and page caches, including render time saved by the page cache"""
+    return jsonify({
+        'completion': completion_cache.stats(),
+        'page': page_cache.stats()
+    })
+
+@app.route('/stats/llm')
+def llm_stats():
+    """API token usage and latency, plus the static/per-request split of the compiled prompts"""
+    return jsonify({
+        'usage': llm_client.usage_stats(),
+        'prompts': prompt_compiler.stats(),
+        'single_flight': single_flight.stats(),
+        'router': llm_router.stats(),
+        'rate_limits': rate_limiter.stats()
+    })
+
+def _prebuilt_json_response(prebuilt):
+    """Serve pre-serialized catalog JSON; immutable when the URL names the current catalog version"""
+    response = Response(prebuilt.body, mimetype='application/json')
+    response.set_etag(prebuilt.etag)
+    if request.args.get('v') == catalog.version:
+        response.headers['Cache-Control'] = CATALOG_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = CATALOG_REVALIDATE_CACHE_CONTROL
+    return response.make_conditional(request)
+
+@app.route('/catalog.json')
+def catalog_json():
+    """The full document catalog: categories with their types, and per-type details"""
+    return _prebuilt_json_response(catalog.document)
 
 @app.route('/get_document_types/<category>')
 def get_document_types(category):
     """AJAX endpoint to get document types for a category"""
-    if category in DOCUMENT_CATEGORIES:
-        return jsonify(DOCUMENT_CATEGORIES[category]['types'])
-    return jsonify([])
+    return _prebuilt_json_response(catalog.category_document(category))
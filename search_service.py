@@ -0,0 +1,138 @@
+import logging
+import unicodedata
+
+from sqlalchemy import text
+from sqlalchemy.orm import load_only
+
+from app import db
+from models import GeneratedDocument
+from history_service import SUMMARY_COLUMNS
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+# Columns covered by the index; both generated and edited bodies are searchable
+SEARCH_COLUMNS = ('sender_name', 'recipient_name', 'purpose', 'generated_content', 'edited_content')
+
+# PostgreSQL: an expression GIN index stays in sync with the row automatically.
+# The 'simple' configuration avoids English stemming so Hindi and Marathi match as typed.
+PG_TSVECTOR = ("to_tsvector('simple', " + " || ' ' || ".join(
+    f"coalesce({column}, '')" for column in SEARCH_COLUMNS) + ")")
+
+PG_SETUP = [
+    f"CREATE INDEX IF NOT EXISTS ix_generated_documents_fts ON generated_documents USING GIN ({PG_TSVECTOR})"
+]
+
+# SQLite: an external-content FTS5 table kept in sync by triggers. Combining marks are token
+# characters so Devanagari vowel signs do not split words.
+SQLITE_COLUMNS = ", ".join(SEARCH_COLUMNS)
+SQLITE_NEW_VALUES = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+SQLITE_OLD_VALUES = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+
+SQLITE_SETUP = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS generated_documents_fts USING fts5(
+        {SQLITE_COLUMNS},
+        content='generated_documents', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 0 categories 'L* N* Co M*'"
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS generated_documents_fts_insert AFTER INSERT ON generated_documents BEGIN
+        INSERT INTO generated_documents_fts(rowid, {SQLITE_COLUMNS}) VALUES (new.id, {SQLITE_NEW_VALUES});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS generated_documents_fts_delete AFTER DELETE ON generated_documents BEGIN
+        INSERT INTO generated_documents_fts(generated_documents_fts, rowid, {SQLITE_COLUMNS})
+        VALUES ('delete', old.id, {SQLITE_OLD_VALUES});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS generated_documents_fts_update AFTER UPDATE ON generated_documents BEGIN
+        INSERT INTO generated_documents_fts(generated_documents_fts, rowid, {SQLITE_COLUMNS})
+        VALUES ('delete', old.id, {SQLITE_OLD_VALUES});
+        INSERT INTO generated_documents_fts(rowid, {SQLITE_COLUMNS}) VALUES (new.id, {SQLITE_NEW_VALUES});
+    END"""
+]
+
+
+def ensure_search_index():
+    """
+    Create the full-text index for the current database if it does not exist yet
+    """
+    dialect = db.engine.dialect.name
+    try:
+        if dialect == 'postgresql':
+            for statement in PG_SETUP:
+                db.session.execute(text(statement))
+        elif dialect == 'sqlite':
+            created = db.session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'generated_documents_fts'"
+            )).first() is None
+            for statement in SQLITE_SETUP:
+                db.session.execute(text(statement))
+            if created:
+                # Index rows written before search existed
+                db.session.execute(text(
+                    "INSERT INTO generated_documents_fts(generated_documents_fts) VALUES ('rebuild')"
+                ))
+        else:
+            logging.warning(f"Full-text search is not supported on {dialect}")
+            return
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Failed to set up full-text search: {str(e)}")
+
+
+def _terms(query_text):
+    """Split a query on the same character classes the FTS5 tokenizer uses (letters, digits, marks)"""
+    cleaned = "".join(
+        char if unicodedata.category(char)[0] in 'LNM' or unicodedata.category(char) == 'Co' else " "
+        for char in query_text
+    )
+    return cleaned.split()
+
+
+def search_documents(query_text, session_id=None, limit=SEARCH_PAGE_SIZE, offset=0):
+    """
+    Ranked search over sender, recipient, purpose and body text
+
+    Returns a list of (document, rank) pairs, best match first; session_id=None searches everything.
+    """
+    terms = _terms(query_text)
+    if not terms:
+        return []
+
+    limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+    dialect = db.engine.dialect.name
+    params = {'limit': limit, 'offset': max(0, offset)}
+    scope = ""
+    if session_id is not None:
+        scope = "AND generated_documents.session_id = :session_id"
+        params['session_id'] = session_id
+
+    if dialect == 'postgresql':
+        params['query'] = " ".join(terms)
+        sql = f"""
+            SELECT generated_documents.id, ts_rank({PG_TSVECTOR}, q) AS rank
+            FROM generated_documents, plainto_tsquery('simple', :query) q
+            WHERE {PG_TSVECTOR} @@ q {scope}
+            ORDER BY rank DESC, generated_documents.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+    elif dialect == 'sqlite':
+        # Quote every term so user input cannot inject FTS5 operators
+        params['query'] = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        sql = f"""
+            SELECT generated_documents.id, -bm25(generated_documents_fts) AS rank
+            FROM generated_documents_fts
+            JOIN generated_documents ON generated_documents.id = generated_documents_fts.rowid
+            WHERE generated_documents_fts MATCH :query {scope}
+            ORDER BY rank DESC, generated_documents.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        raise RuntimeError(f"Full-text search is not supported on {dialect}")
+
+    ranked = db.session.execute(text(sql), params).all()
+    if not ranked:
+        return []
+
+    documents = {document.id: document for document in
+                 GeneratedDocument.query.options(load_only(*SUMMARY_COLUMNS)).filter(GeneratedDocument.id.in_([row.id for row in ranked])).all()}
+    return [(documents[row.id], float(row.rank)) for row in ranked if row.id in documents]
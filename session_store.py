@@ -0,0 +1,167 @@
+import os
+import time
+import secrets
+import logging
+from datetime import datetime
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from app import db
+from models import ServerSession
+from upsert import dialect_insert
+from completion_cache import MemoryCacheTier
+
+SESSION_PURGE_INTERVAL = float(os.environ.get("SESSION_PURGE_INTERVAL", "3600"))
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = int(os.environ.get("SESSION_CACHE_TTL", "300"))
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """
+    Session whose data lives in the server_sessions table; the cookie only carries its id
+    """
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None, version=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.version = version
+        self.modified = False
+
+
+class DatabaseSessionInterface(SessionInterface):
+    """
+    Stores session data server-side so generated letters are not shipped in a cookie on every request
+
+    Rows are written only when the session changes, or when less than half of their lifetime is left.
+
+    The cookie holds "<sid>.<version>", and every write issues a new version. Sessions are cached in
+    memory by sid, and a cached copy is used only while its version matches the cookie. Repeat page
+    views therefore skip the database, while a session rewritten by another worker is still
+    reloaded. Static files get no session at all.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, purge_interval=SESSION_PURGE_INTERVAL, cache_size=SESSION_CACHE_SIZE,
+                 cache_ttl=SESSION_CACHE_TTL):
+        self.purge_interval = purge_interval
+        self._last_purge = time.monotonic()
+        self._cache = MemoryCacheTier(max_entries=cache_size, ttl_seconds=cache_ttl)
+
+    def open_session(self, app, request):
+        # The URL is not matched yet when the session opens, so static files are recognized by path
+        if app.static_url_path and request.path.startswith(app.static_url_path + '/'):
+            return self.make_null_session(app)
+
+        sid, _, version = request.cookies.get(self.get_cookie_name(app), '').partition('.')
+        if sid:
+            cached = self._cache.get(sid)
+            if cached is not None and version and cached[0] == version:
+                _, data, expires_at = cached
+                if expires_at > datetime.utcnow():
+                    return ServerSideSession(self.serializer.loads(data), sid=sid, expires_at=expires_at,
+                                             version=version)
+            try:
+                row = db.session.get(ServerSession, sid)
+                if row is not None and row.expires_at > datetime.utcnow():
+                    self._cache.set(sid, (version, row.data, row.expires_at))
+                    return ServerSideSession(self.serializer.loads(row.data), sid=sid, expires_at=row.expires_at,
+                                             version=version)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Failed to load session: {str(e)}")
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self._delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if session.new and not session.modified:
+            return
+
+        now = datetime.utcnow()
+        lifetime = app.permanent_session_lifetime
+        stale = session.expires_at is None or session.expires_at - now < lifetime / 2
+        if session.modified or stale:
+            session.version = secrets.token_urlsafe(6)
+            session.expires_at = now + lifetime
+            data = self.serializer.dumps(dict(session))
+            if self._store(session.sid, data, session.expires_at):
+                self._cache.set(session.sid, (session.version, data, session.expires_at))
+            self._maybe_purge()
+
+        if session.new or session.modified or stale or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name,
+                f"{session.sid}.{session.version}",
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
+
+    def _store(self, sid, data, expires_at):
+        try:
+            insert = dialect_insert(db.engine.dialect.name)
+            if insert is None:
+                row = db.session.get(ServerSession, sid)
+                if row is None:
+                    db.session.add(ServerSession(sid=sid, data=data, expires_at=expires_at))
+                else:
+                    row.data = data
+                    row.expires_at = expires_at
+            else:
+                statement = insert(ServerSession.__table__).values(
+                    sid=sid, data=data, expires_at=expires_at, updated_at=datetime.utcnow()
+                )
+                statement = statement.on_conflict_do_update(
+                    index_elements=['sid'],
+                    set_={
+                        'data': statement.excluded.data,
+                        'expires_at': statement.excluded.expires_at,
+                        'updated_at': statement.excluded.updated_at
+                    }
+                )
+                db.session.execute(statement)
+            db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Failed to save session: {str(e)}")
+            return False
+
+    def _delete(self, sid):
+        self._cache.set(sid, None)
+        try:
+            ServerSession.query.filter_by(sid=sid).delete()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Failed to delete session: {str(e)}")
+
+    def _maybe_purge(self):
+        now = time.monotonic()
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        try:
+            ServerSession.query.filter(ServerSession.expires_at <= datetime.utcnow()).delete()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Failed to purge expired sessions: {str(e)}")
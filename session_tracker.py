@@ -0,0 +1,111 @@
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from app import app, db
+from models import UserSession
+from upsert import dialect_insert
+
+SESSION_TOUCH_INTERVAL = float(os.environ.get("SESSION_TOUCH_INTERVAL", "300"))
+SESSION_FLUSH_INTERVAL = float(os.environ.get("SESSION_FLUSH_INTERVAL", "15"))
+
+
+def upsert_sessions(last_seen):
+    """
+    Insert new sessions and bump last_activity for known ones with a single statement
+    """
+    if not last_seen:
+        return
+
+    table = UserSession.__table__
+    rows = [{'session_id': session_id, 'first_visit': seen_at, 'last_activity': seen_at}
+            for session_id, seen_at in last_seen.items()]
+
+    insert = dialect_insert(db.engine.dialect.name)
+    if insert is None:
+        existing = {row.session_id: row for row in
+                    UserSession.query.filter(UserSession.session_id.in_(list(last_seen))).all()}
+        for row in rows:
+            user_session = existing.get(row['session_id'])
+            if user_session is None:
+                db.session.add(UserSession(**row))
+            else:
+                user_session.last_activity = row['last_activity']
+        db.session.commit()
+        return
+
+    statement = insert(table).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=['session_id'],
+        set_={'last_activity': statement.excluded.last_activity}
+    )
+    db.session.execute(statement)
+    db.session.commit()
+
+
+class SessionActivityTracker:
+    """
+    Coalesces page-view activity in memory so each session is written at most once per touch interval
+    """
+
+    def __init__(self, app, touch_interval=SESSION_TOUCH_INTERVAL, flush_interval=SESSION_FLUSH_INTERVAL,
+                 max_tracked=100000):
+        self.app = app
+        self.touch_interval = touch_interval
+        self.flush_interval = flush_interval
+        self.max_tracked = max_tracked
+        self._pending = {}
+        self._last_written = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stopping = threading.Event()
+
+    def touch(self, session_id):
+        """Record activity for a session; no database round-trip happens on the request path"""
+        now = time.monotonic()
+        with self._lock:
+            last_written = self._last_written.get(session_id)
+            if last_written is not None and now - last_written < self.touch_interval:
+                return
+            self._last_written[session_id] = now
+            self._pending[session_id] = datetime.utcnow()
+            if len(self._last_written) > self.max_tracked:
+                self._forget_idle(now)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name='session-flusher', daemon=True)
+                self._flusher.start()
+
+    def _forget_idle(self, now):
+        # Sessions idle for longer than the touch interval would be written on their next hit anyway
+        self._last_written = {session_id: written for session_id, written in self._last_written.items()
+                              if now - written < self.touch_interval}
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        try:
+            with self.app.app_context():
+                upsert_sessions(pending)
+        except Exception as e:
+            logging.error(f"Failed to flush session activity: {str(e)}")
+            with self._lock:
+                for session_id, seen_at in pending.items():
+                    self._pending[session_id] = max(seen_at, self._pending.get(session_id, seen_at))
+
+    def shutdown(self):
+        self._stopping.set()
+        self.flush()
+
+
+session_tracker = SessionActivityTracker(app)
+atexit.register(session_tracker.shutdown)
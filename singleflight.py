@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from flask import has_app_context
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from upsert import dialect_insert
+
+SINGLE_FLIGHT_LOCK_TTL = float(os.environ.get("SINGLE_FLIGHT_LOCK_TTL", "120"))
+SINGLE_FLIGHT_RESULT_TTL = float(os.environ.get("SINGLE_FLIGHT_RESULT_TTL", "15"))
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.environ.get("SINGLE_FLIGHT_POLL_INTERVAL", "0.25"))
+
+
+def flight_key(namespace, value):
+    """Stable key for a normalized request; dicts are serialized with sorted keys"""
+    serialized = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{namespace}:{serialized}".encode('utf-8')).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Runs concurrent calls with the same key once and hands every caller the same result
+
+    Within a process, followers wait on the leader's event. Across workers, the leader holds a row in
+    generation_locks and publishes its JSON result there; followers in other workers poll that row.
+    Published results are kept for a short time so a late duplicate (a double-click) still shares them.
+    Results must be JSON-serializable.
+    """
+
+    def __init__(self, lock_ttl=SINGLE_FLIGHT_LOCK_TTL, result_ttl=SINGLE_FLIGHT_RESULT_TTL,
+                 poll_interval=SINGLE_FLIGHT_POLL_INTERVAL, purge_every=100):
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.purge_every = purge_every
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._counters = {'leaders': 0, 'local_shared': 0, 'remote_shared': 0}
+
+    def _bump(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self._bump('local_shared')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_shared(key, fn) if has_app_context() else fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run_shared(self, key, fn):
+        owner = str(uuid.uuid4())
+        deadline = time.monotonic() + self.lock_ttl
+        while True:
+            try:
+                published = self._published(key)
+                if published is not None:
+                    self._bump('remote_shared')
+                    return published
+                acquired = self._acquire(key, owner)
+            except Exception as e:
+                # The lock table is an optimization; never fail a generation because of it
+                logging.warning(f"Single-flight lock unavailable: {str(e)}")
+                return fn()
+
+            if acquired:
+                self._bump('leaders')
+                try:
+                    result = fn()
+                except Exception:
+                    self._release(key, owner)
+                    raise
+                self._publish(key, owner, result)
+                return result
+
+            if time.monotonic() >= deadline:
+                logging.warning(f"Single-flight wait for {key[:12]} timed out; running without it")
+                return fn()
+            time.sleep(self.poll_interval)
+
+    def _engine(self):
+        # Lock rows go through their own connections so they never touch the request's session
+        from app import db
+        return db.engine
+
+    def _published(self, key):
+        from models import GenerationLock
+
+        table = GenerationLock.__table__
+        with self._engine().connect() as connection:
+            row = connection.execute(
+                select(table.c.result, table.c.expires_at).where(table.c.flight_key == key)
+            ).first()
+        if row is None or row.result is None or row.expires_at <= datetime.utcnow():
+            return None
+        return json.loads(row.result)
+
+    def _acquire(self, key, owner):
+        from models import GenerationLock
+
+        table = GenerationLock.__table__
+        now = datetime.utcnow()
+        values = {'flight_key': key, 'owner': owner, 'created_at': now,
+                  'expires_at': now + timedelta(seconds=self.lock_ttl)}
+        engine = self._engine()
+        insert = dialect_insert(engine.dialect.name)
+
+        with self._lock:
+            self._acquired += 1
+            purge = self._acquired % self.purge_every == 0
+
+        try:
+            with engine.begin() as connection:
+                stale = table.c.expires_at <= now
+                connection.execute(delete(table).where(stale if purge else (table.c.flight_key == key) & stale))
+                if insert is None:
+                    connection.execute(table.insert().values(**values))
+                    return True
+                result = connection.execute(insert(table).values(**values).on_conflict_do_nothing())
+                return result.rowcount == 1
+        except IntegrityError:
+            return False
+
+    def _publish(self, key, owner, result):
+        from models import GenerationLock
+
+        table = GenerationLock.__table__
+        try:
+            with self._engine().begin() as connection:
+                connection.execute(
+                    update(table)
+                    .where(table.c.flight_key == key, table.c.owner == owner)
+                    .values(result=json.dumps(result, ensure_ascii=False),
+                            expires_at=datetime.utcnow() + timedelta(seconds=self.result_ttl))
+                )
+        except Exception as e:
+            logging.warning(f"Failed to publish single-flight result: {str(e)}")
+
+    def _release(self, key, owner):
+        from models import GenerationLock
+
+        table = GenerationLock.__table__
+        try:
+            with self._engine().begin() as connection:
+                connection.execute(delete(table).where(table.c.flight_key == key, table.c.owner == owner))
+        except Exception as e:
+            logging.warning(f"Failed to release single-flight lock: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+
+single_flight = SingleFlight()
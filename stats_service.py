@@ -0,0 +1,142 @@
+import os
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from sqlalchemy import case
+
+from app import app, db
+from models import DocumentStats
+from upsert import dialect_insert
+
+STATS_FLUSH_INTERVAL = float(os.environ.get("STATS_FLUSH_INTERVAL", "30"))
+
+
+def upsert_stats(rows):
+    """
+    Add counts into document_stats with one INSERT ... ON CONFLICT statement per flush
+    """
+    if not rows:
+        return
+
+    table = DocumentStats.__table__
+    insert = dialect_insert(db.engine.dialect.name)
+    if insert is None:
+        # Portable fallback for databases without ON CONFLICT support
+        for row in rows:
+            stats = DocumentStats.query.filter_by(
+                document_type=row['document_type'], category=row['category'], language=row['language']
+            ).with_for_update().first()
+            if stats is None:
+                db.session.add(DocumentStats(**row))
+            else:
+                stats.generation_count += row['generation_count']
+                stats.last_generated = max(stats.last_generated, row['last_generated'])
+        db.session.commit()
+        return
+
+    statement = insert(table).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=['document_type', 'category', 'language'],
+        set_={
+            'generation_count': table.c.generation_count + statement.excluded.generation_count,
+            'last_generated': case(
+                (statement.excluded.last_generated > table.c.last_generated, statement.excluded.last_generated),
+                else_=table.c.last_generated
+            )
+        }
+    )
+    db.session.execute(statement)
+    db.session.commit()
+
+
+class StatsAggregator:
+    """
+    Per-process write-behind counters for document_stats, flushed periodically as batched upserts
+    """
+
+    def __init__(self, app, flush_interval=STATS_FLUSH_INTERVAL):
+        self.app = app
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stopping = threading.Event()
+
+    def record(self, document_type, category, language, count=1):
+        key = (document_type, category, language or 'english')
+        now = datetime.utcnow()
+        with self._lock:
+            pending_count, _ = self._pending.get(key, (0, now))
+            self._pending[key] = (pending_count + count, now)
+            if self._flusher is None:
+                self._start()
+
+    def _start(self):
+        self._flusher = threading.Thread(target=self._run, name='stats-flusher', daemon=True)
+        self._flusher.start()
+
+    def _run(self):
+        while not self._stopping.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Write pending counters; on failure they are merged back for the next flush"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        rows = [{
+            'document_type': document_type,
+            'category': category,
+            'language': language,
+            'generation_count': count,
+            'last_generated': last_generated
+        } for (document_type, category, language), (count, last_generated) in pending.items()]
+
+        try:
+            with self.app.app_context():
+                upsert_stats(rows)
+        except Exception as e:
+            logging.error(f"Failed to flush document stats: {str(e)}")
+            with self._lock:
+                for key, (count, last_generated) in pending.items():
+                    pending_count, pending_last = self._pending.get(key, (0, last_generated))
+                    self._pending[key] = (pending_count + count, max(pending_last, last_generated))
+
+    def shutdown(self):
+        self._stopping.set()
+        self.flush()
+
+
+def popular_document_types(limit=10, category=None, language=None):
+    """
+    Most generated document types, read from the document_stats aggregates
+    """
+    query = db.session.query(
+        DocumentStats.document_type,
+        DocumentStats.category,
+        db.func.sum(DocumentStats.generation_count).label('generation_count'),
+        db.func.max(DocumentStats.last_generated).label('last_generated')
+    )
+    if category:
+        query = query.filter(DocumentStats.category == category)
+    if language:
+        query = query.filter(DocumentStats.language == language)
+
+    rows = (query.group_by(DocumentStats.document_type, DocumentStats.category)
+            .order_by(db.desc('generation_count'))
+            .limit(limit)
+            .all())
+    return [{
+        'document_type': row.document_type,
+        'category': row.category,
+        'generation_count': int(row.generation_count),
+        'last_generated': row.last_generated.isoformat() if row.last_generated else None
+    } for row in rows]
+
+
+stats_aggregator = StatsAggregator(app)
+atexit.register(stats_aggregator.shutdown)
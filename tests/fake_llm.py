@@ -0,0 +1,83 @@
+"""
+A local OpenAI-compatible chat completions server for tests
+
+Replies are scripted: each request takes the next ``Reply`` from the queue (the last one repeats),
+so tests can simulate rate limits, server errors and hung upstream calls without network access.
+"""
+import json
+import time
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_client import LLMClient
+
+Reply = namedtuple('Reply', ['status', 'content', 'delay', 'headers'], defaults=[200, 'Fake letter.', 0.0, None])
+
+
+class FakeLLMServer:
+    def __init__(self, *replies):
+        self.replies = list(replies) or [Reply()]
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def client(self, **options):
+        """An LLMClient pointed at this server"""
+        options.setdefault('sleep', lambda seconds: None)
+        return LLMClient(api_key='test', base_url=self.base_url, http2=False, **options)
+
+    def _next_reply(self, body):
+        with self._lock:
+            self.requests.append(body)
+            return self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                reply = server._next_reply(body)
+                time.sleep(reply.delay)
+                if reply.status == 200:
+                    payload = {
+                        'id': 'chatcmpl-fake', 'object': 'chat.completion', 'created': 0, 'model': body.get('model'),
+                        'choices': [{'index': 0, 'finish_reason': 'stop',
+                                     'message': {'role': 'assistant', 'content': reply.content}}],
+                        'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15}
+                    }
+                else:
+                    payload = {'error': {'message': reply.content, 'type': 'fake_error'}}
+                data = json.dumps(payload).encode('utf-8')
+                try:
+                    self.send_response(reply.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    for name, value in (reply.headers or {}).items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (timed out) before the reply was ready
+                    pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
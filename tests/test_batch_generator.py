@@ -0,0 +1,47 @@
+import time
+
+from app import app, db
+from models import GeneratedDocument, GenerationJob
+from job_queue import JobQueue, JOB_SUCCEEDED, JOB_FAILED
+from batch_generator import batch_job_params, batch_row_kwargs, generate_batch_row, save_batch_row
+from llm_router import llm_router
+from rate_limit import RateLimitExceeded
+
+ROW = {'document_type': 'Leave Application', 'category': 'general', 'language': 'english', 'tone': 'formal',
+       'sender_name': 'Batch Row', 'recipient_name': 'The Principal', 'purpose': 'quota retry test',
+       'reason': None, 'date_range': None, 'additional_details': None}
+
+
+def test_rate_limited_rows_are_retried_instead_of_saved_as_demo_letters(monkeypatch):
+    replies = [RateLimitExceeded('global_requests', 0), "Dear Principal, I request leave."]
+
+    def complete(*args, **kwargs):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setattr(llm_router, 'complete', complete)
+    job_queue = JobQueue(app, generate_batch_row, save_batch_row, kwargs_for=batch_row_kwargs, kind='batch',
+                         workers=1, retry_backoff=0.01)
+    try:
+        with app.app_context():
+            [job] = job_queue.enqueue_many(batch_job_params([ROW]), batch_id='quota-retry')
+            job_id = job.id
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            with app.app_context():
+                job = db.session.get(GenerationJob, job_id)
+                if job.status in (JOB_SUCCEEDED, JOB_FAILED):
+                    result = (job.status, job.attempts, db.session.get(GeneratedDocument, job.document_id))
+                    break
+            time.sleep(0.05)
+        else:
+            raise AssertionError("batch row did not finish in time")
+
+        status, attempts, document = result
+        assert (status, attempts) == (JOB_SUCCEEDED, 2)
+        assert document.generated_content == "Dear Principal, I request leave." and not document.is_demo
+    finally:
+        job_queue.shutdown()
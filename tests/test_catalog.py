@@ -0,0 +1,36 @@
+import re
+from collections import defaultdict
+
+from catalog import catalog, TYPE_ALIASES
+from document_types import DOCUMENT_TYPES
+
+FILLER_WORDS = {'application', 'letter', 'form', 'for', 'of', 'to', 'the', 'and'}
+
+
+def _type_key(name):
+    """Loose identity of a type name: a parenthesised acronym alone, else its words minus filler, unordered"""
+    acronym = re.search(r"\(([A-Z]{2,})[/A-Z]*\)", name)
+    if acronym:
+        return acronym.group(1).lower()
+    # Only the first of slash-separated alternatives counts ("Application/Correction" -> "application")
+    words = [word.split('/')[0] for word in re.findall(r"[a-z/]+", name.lower())]
+    return " ".join(sorted(word for word in words if word and word not in FILLER_WORDS))
+
+
+def test_no_two_catalog_types_normalise_to_the_same_key():
+    names = defaultdict(list)
+    for name in catalog.types:
+        names[_type_key(name)].append(name)
+
+    assert {key: found for key, found in names.items() if len(found) > 1} == {}
+
+
+def test_aliases_merge_prompt_metadata_onto_the_listed_type():
+    for alias, name in TYPE_ALIASES.items():
+        assert alias not in catalog.types
+        assert alias in catalog and catalog.get(alias) is catalog.get(name)
+        assert catalog.get(name)['fields'] == DOCUMENT_TYPES[alias]['fields']
+        assert sum(name in category['types'] for category in catalog.categories.values()) == 1
+
+    rti = catalog.get('RTI Application')
+    assert (rti['name'], rti['category']) == ('Right to Information (RTI) Application', 'government')
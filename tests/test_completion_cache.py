@@ -0,0 +1,99 @@
+import uuid
+
+import pytest
+
+import completion_cache as cache_module
+from app import app, db
+from completion_cache import CompletionCache, DatabaseCacheTier, MemoryCacheTier, cached_completion, make_cache_key
+from models import CompletionCacheEntry
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def app_context():
+    with app.app_context():
+        yield
+
+
+def _key():
+    return make_cache_key('test-model', [{'role': 'user', 'content': str(uuid.uuid4())}], 0.7)
+
+
+def test_memory_tier_evicts_least_recently_used(clock):
+    tier = MemoryCacheTier(max_entries=2, ttl_seconds=60)
+    tier.set('a', 'A')
+    tier.set('b', 'B')
+    assert tier.get('a') == 'A'  # 'b' is now the least recently used
+    tier.set('c', 'C')
+
+    assert (tier.get('a'), tier.get('b'), tier.get('c')) == ('A', None, 'C')
+    assert len(tier) == 2
+
+
+def test_memory_tier_expires_entries(clock):
+    tier = MemoryCacheTier(ttl_seconds=60)
+    tier.set('a', 'A')
+    clock[0] += 59
+    assert tier.get('a') == 'A'
+    clock[0] += 2
+
+    assert tier.get('a') is None and len(tier) == 0
+
+
+def test_database_tier_hits_overwrites_and_expires(app_context):
+    tier = DatabaseCacheTier(ttl_seconds=60)
+    key = _key()
+    assert tier.get(key) is None
+    tier.set(key, 'first', model='test-model')
+    tier.set(key, 'second', model='test-model')
+    assert tier.get(key) == 'second'
+
+    expired = DatabaseCacheTier(ttl_seconds=-1)
+    stale_key = _key()
+    expired.set(stale_key, 'stale')
+    assert expired.get(stale_key) is None
+    assert db.session.query(CompletionCacheEntry).filter_by(cache_key=stale_key).count() == 0
+
+
+def test_database_tier_prunes_oldest_rows_beyond_the_limit(app_context):
+    tier = DatabaseCacheTier(max_entries=3, prune_every=1000)
+    tier.clear()
+    keys = [_key() for _ in range(5)]
+    for key in keys:
+        tier.set(key, key)
+    tier.prune()
+
+    assert [tier.get(key) for key in keys] == [None, None] + keys[2:]
+
+
+def test_database_hits_are_promoted_to_memory(app_context):
+    memory, database = MemoryCacheTier(), DatabaseCacheTier()
+    cache = CompletionCache([memory, database])
+    key = _key()
+    database.set(key, 'from database')
+
+    assert cache.get(key) == 'from database'
+    assert memory.get(key) == 'from database'
+    assert cache.get(key) == 'from database'
+    stats = cache.stats()
+    assert (stats['database_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 0)
+
+
+def test_cached_completion_calls_the_model_once(app_context):
+    cache = CompletionCache([MemoryCacheTier()])
+    calls = []
+    messages = [{'role': 'user', 'content': str(uuid.uuid4())}]
+
+    def create():
+        calls.append(1)
+        return 'Dear Sir,'
+
+    assert cached_completion('test-model', messages, 0.7, create, cache=cache) == 'Dear Sir,'
+    assert cached_completion('test-model', messages, 0.7, create, cache=cache) == 'Dear Sir,'
+    assert len(calls) == 1
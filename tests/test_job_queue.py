@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from app import app, db
+from models import GeneratedDocument, GenerationJob
+from job_queue import JobQueue, JOB_SUCCEEDED, JOB_FAILED
+from fake_llm import FakeLLMServer, Reply
+
+
+def _generator(client):
+    def generate(document_type, sender_name, timeout=None):
+        return client.chat([{'role': 'user', 'content': f"{document_type} for {sender_name}"}],
+                           max_tokens=100, temperature=0.7, timeout=timeout)
+    return generate
+
+
+def _persist(params, content):
+    document = GeneratedDocument(document_type=params['document_type'], category='general',
+                                 sender_name=params['sender_name'], recipient_name='Principal',
+                                 purpose='test', generated_content=content)
+    db.session.add(document)
+    db.session.commit()
+    return document
+
+
+def _wait_for(job_ids, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with app.app_context():
+            jobs = [db.session.get(GenerationJob, job_id) for job_id in job_ids]
+            if all(job.status in (JOB_SUCCEEDED, JOB_FAILED) for job in jobs):
+                return [(job.status, job.attempts, job.document_id) for job in jobs]
+        time.sleep(0.05)
+    raise AssertionError("jobs did not finish in time")
+
+
+def _enqueue(job_queue, count=1):
+    with app.app_context():
+        return [job_queue.enqueue({'document_type': 'Leave Application', 'sender_name': f"Student {index}"}).id
+                for index in range(count)]
+
+
+@pytest.fixture
+def make_queue():
+    queues = []
+
+    def make(server, **options):
+        job_queue = JobQueue(app, _generator(server.client(max_retries=0)), _persist, retry_backoff=0.01, **options)
+        queues.append(job_queue)
+        return job_queue
+
+    yield make
+    for job_queue in queues:
+        job_queue.shutdown()
+
+
+def test_job_succeeds_with_generated_content(make_queue):
+    with FakeLLMServer(Reply(content="Dear Principal, ...")) as server:
+        job_queue = make_queue(server)
+        [(status, attempts, document_id)] = _wait_for(_enqueue(job_queue))
+
+    assert (status, attempts) == (JOB_SUCCEEDED, 1)
+    with app.app_context():
+        assert db.session.get(GeneratedDocument, document_id).generated_content == "Dear Principal, ..."
+
+
+def test_failed_attempts_are_retried(make_queue):
+    with FakeLLMServer(Reply(status=500, content="boom"), Reply(content="ok")) as server:
+        job_queue = make_queue(server, max_attempts=3)
+        [(status, attempts, _)] = _wait_for(_enqueue(job_queue))
+
+    assert (status, attempts) == (JOB_SUCCEEDED, 2)
+
+
+def test_hung_llm_calls_time_out_without_starving_workers(make_queue):
+    with FakeLLMServer(Reply(delay=2.0), Reply(delay=2.0), Reply(content="fast")) as server:
+        job_queue = make_queue(server, workers=1, timeout=0.3, max_attempts=1)
+        started = time.monotonic()
+        results = _wait_for(_enqueue(job_queue, count=3))
+
+    # The single worker is freed by the client timeout, not after the hung requests finish
+    assert [status for status, _, _ in results] == [JOB_FAILED, JOB_FAILED, JOB_SUCCEEDED]
+    assert time.monotonic() - started < 2.0
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+from openai import APIStatusError, APITimeoutError
+
+from fake_llm import FakeLLMServer, Reply
+from llm_client import LLMClient
+from rate_limit import RateLimiter, MemoryBucketStore, RateLimitExceeded
+
+MESSAGES = [{'role': 'user', 'content': 'Write a leave application'}]
+
+
+def _chat(client, **options):
+    return client.chat(MESSAGES, max_tokens=100, temperature=0.7, **options)
+
+
+def test_chat_returns_stripped_content_and_records_usage():
+    with FakeLLMServer(Reply(content="  Dear Sir,  ")) as server:
+        client = server.client()
+        assert _chat(client) == "Dear Sir,"
+
+    usage = client.usage_stats()
+    assert (usage['requests'], usage['prompt_tokens'], usage['completion_tokens']) == (1, 10, 5)
+
+
+def test_retries_server_errors_with_backoff():
+    delays = []
+    with FakeLLMServer(Reply(status=503, content="busy"), Reply(status=429, content="slow down"),
+                       Reply(content="ok")) as server:
+        client = server.client(max_retries=3, backoff_base=0.5, backoff_max=8.0, sleep=delays.append)
+        assert _chat(client) == "ok"
+
+    assert len(server.requests) == 3
+    assert len(delays) == 2 and all(0 <= delay <= 8.0 for delay in delays)
+
+
+def test_client_errors_are_not_retried():
+    with FakeLLMServer(Reply(status=400, content="bad request"), Reply(content="ok")) as server:
+        client = server.client(max_retries=3)
+        with pytest.raises(APIStatusError):
+            _chat(client)
+
+    assert len(server.requests) == 1
+
+
+def test_gives_up_after_max_retries():
+    with FakeLLMServer(Reply(status=500, content="boom")) as server:
+        client = server.client(max_retries=2)
+        with pytest.raises(APIStatusError):
+            _chat(client)
+
+    assert len(server.requests) == 3
+
+
+def test_retry_after_is_honoured_in_full():
+    delays = []
+    with FakeLLMServer(Reply(status=429, content="slow down", headers={'Retry-After': '5'}),
+                       Reply(content="ok")) as server:
+        client = server.client(backoff_max=8.0, sleep=delays.append)
+        assert _chat(client) == "ok"
+
+    assert delays == [5.0]
+
+
+def test_retry_after_beyond_the_backoff_budget_fails_fast():
+    delays = []
+    with FakeLLMServer(Reply(status=429, content="slow down", headers={'Retry-After': '120'}),
+                       Reply(content="ok")) as server:
+        client = server.client(backoff_max=8.0, sleep=delays.append)
+        with pytest.raises(APIStatusError):
+            _chat(client)
+
+    assert delays == [] and len(server.requests) == 1
+
+
+def test_timeout_bounds_the_whole_call():
+    with FakeLLMServer(Reply(delay=2.0)) as server:
+        client = server.client(max_retries=3, sleep=time.sleep)
+        started = time.monotonic()
+        with pytest.raises(APITimeoutError):
+            _chat(client, timeout=0.3)
+
+    assert time.monotonic() - started < 1.5
+
+
+def test_every_attempt_is_charged_to_the_provider_quota():
+    quota = RateLimiter(MemoryBucketStore(), global_rpm=(10, 0.001), global_tpm=(10000, 0.001))
+    with FakeLLMServer(Reply(status=503, content="busy"), Reply(content="ok")) as server:
+        client = server.client(max_retries=3, quota=quota, provider='fake')
+        assert _chat(client) == "ok"
+
+    _, requests_left = quota.store.take('global_requests:fake', 0, 10, 0.001, time.time())
+    _, tokens_left = quota.store.take('global_tokens:fake', 0, 10000, 0.001, time.time())
+    # Both attempts spent a request; the failed one keeps its estimate, the successful one its usage
+    assert round(requests_left) == 8
+    assert round(tokens_left) == 10000 - LLMClient.estimate_tokens(MESSAGES, 100) - 15
+
+
+def test_exhausted_provider_quota_stops_before_calling_upstream():
+    quota = RateLimiter(MemoryBucketStore(), global_rpm=(1, 0.001))
+    with FakeLLMServer(Reply(content="ok")) as server:
+        client = server.client(quota=quota, provider='fake')
+        assert _chat(client) == "ok"
+        with pytest.raises(RateLimitExceeded):
+            _chat(client)
+
+    assert len(server.requests) == 1
@@ -0,0 +1,32 @@
+import pytest
+from jinja2 import ChoiceLoader, DictLoader
+
+from main import app
+from page_cache import page_cache
+
+TEMPLATES = {
+    'generate.html': '<h1>{{ document_type }}</h1><p>{{ document_info.category }}</p>',
+    'index.html': '{{ get_flashed_messages() | join }}'
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app.jinja_env, 'loader', ChoiceLoader([DictLoader(TEMPLATES), app.jinja_env.loader]))
+    app.jinja_env.cache.clear()
+    page_cache.clear()
+    yield app.test_client()
+    app.jinja_env.cache.clear()
+    page_cache.clear()
+
+
+def test_generate_form_shows_the_requested_type_on_miss_and_hit(client):
+    hits = page_cache.stats()['hits']
+    for _ in range(2):
+        response = client.get('/generate', query_string={'type': 'Leave Application'})
+        assert response.status_code == 200
+        assert b'<h1>Leave Application</h1><p>general</p>' in response.data
+    assert page_cache.stats()['hits'] == hits + 1
+
+    other = client.get('/generate', query_string={'type': 'Passport Application'})
+    assert b'<h1>Passport Application</h1>' in other.data
@@ -0,0 +1,24 @@
+import pytest
+
+import pdf_generator
+from pdf_generator import generate_pdf, get_layout_profile, unavailable_languages, FontUnavailable
+
+LETTER = {'content': 'महोदय,\n\nमुझे तीन दिनों की छुट्टी चाहिए।', 'document_type': 'Leave Application',
+          'sender_name': 'आशा', 'recipient_name': 'प्राचार्य'}
+
+
+@pytest.fixture
+def without_devanagari_font(monkeypatch):
+    monkeypatch.delitem(pdf_generator.LAYOUT_PROFILES, 'a4-devanagari', raising=False)
+
+
+@pytest.mark.parametrize('language', ['hindi', 'marathi'])
+def test_devanagari_languages_are_refused_without_their_font(without_devanagari_font, language):
+    assert language in unavailable_languages()
+    with pytest.raises(FontUnavailable, match='fonts/README.md'):
+        generate_pdf({**LETTER, 'language': language})
+
+
+def test_other_languages_and_named_profiles_still_render(without_devanagari_font):
+    assert generate_pdf({**LETTER, 'content': 'Dear Sir,', 'language': 'english'}).getvalue().startswith(b'%PDF')
+    assert get_layout_profile('letter', language='hindi').name == 'letter'
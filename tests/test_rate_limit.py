@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from app import app
+import openai_service
+from llm_router import llm_router
+from rate_limit import RateLimiter, DatabaseBucketStore, RateLimitExceeded
+
+
+def test_database_store_charges_provider_calls_from_threads_without_app_context():
+    quota = RateLimiter(DatabaseBucketStore(), global_rpm=(1, 0.001))
+    outcomes = []
+
+    def charge():
+        for _ in range(2):
+            try:
+                quota.charge_provider('threaded', 0)
+                outcomes.append('charged')
+            except RateLimitExceeded as e:
+                outcomes.append(e.bucket)
+
+    # Like the router's hedging executor: a plain thread with no app context pushed
+    thread = threading.Thread(target=charge)
+    thread.start()
+    thread.join()
+
+    assert outcomes == ['charged', 'global_requests']
+
+
+def test_spent_provider_quota_is_not_served_as_a_template_letter(monkeypatch):
+    def complete(*args, **kwargs):
+        raise RateLimitExceeded('global_requests', 30)
+
+    monkeypatch.setattr(llm_router, 'complete', complete)
+    fallbacks = llm_router.stats()['fallbacks']
+    with app.app_context(), pytest.raises(RateLimitExceeded):
+        openai_service.generate_letter_content('Leave Application', 'english', 'formal', 'Quota Tester',
+                                               'The Principal', 'rate limit test', mode='ai')
+
+    assert llm_router.stats()['fallbacks'] == fallbacks
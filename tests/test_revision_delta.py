@@ -0,0 +1,83 @@
+import random
+
+from app import app, db
+from document_edits import record_revision, revision_content
+from models import GeneratedDocument
+from revision_delta import RevisionPolicy, apply_delta, line_delta, replay, text_lines
+
+BASE = "Respected Sir,\n\nI request leave for three days.\nI was unwell with fever.\n\nYours faithfully,\nAsha\n"
+
+
+def _history(base, count, seed=3):
+    rng = random.Random(seed)
+    lines, texts = text_lines(base), []
+    for number in range(count):
+        index = rng.randrange(len(lines))
+        if rng.random() < 0.7:
+            lines[index] = lines[index].rstrip('\n') + f" ({number})\n"
+        else:
+            lines.insert(index, f"Added line {number}.\n")
+        texts.append(''.join(lines))
+    return texts
+
+
+def _store(policy, base, texts):
+    rows, previous = {}, base
+    for number, text in enumerate(texts, start=1):
+        rows[number] = policy.encode(number, previous, text)
+        checkpoints = [revision for revision, (_, snapshot) in rows.items() if snapshot is not None]
+        oldest = policy.oldest_kept(number, checkpoints)
+        rows = {revision: row for revision, row in rows.items() if revision >= oldest}
+        previous = text
+    return rows
+
+
+def _rebuild(rows, base, revision):
+    first = max([number for number, (_, snapshot) in rows.items() if snapshot is not None and number <= revision],
+                default=min(rows))
+    return replay(base, [rows[number] for number in range(first, revision + 1)])
+
+
+def test_line_delta_round_trips_and_keeps_line_endings():
+    old = text_lines("one\ntwo\r\nthree")
+    new = text_lines("zero\none\ntwo changed\r\nthree")
+
+    assert ''.join(apply_delta(old, line_delta(old, new))) == "zero\none\ntwo changed\r\nthree"
+    assert line_delta(old, old) == []
+
+
+def test_checkpoints_follow_the_interval_and_large_deltas():
+    policy = RevisionPolicy(checkpoint_interval=5, checkpoint_ratio=0.5, history_limit=0)
+
+    assert policy.encode(3, BASE, BASE + "P.S. Thanks.\n")[1] is None
+    assert policy.encode(5, BASE, BASE + "P.S. Thanks.\n") == (None, BASE + "P.S. Thanks.\n")
+    assert policy.encode(3, BASE, "Completely different text.\n")[0] is None
+    assert policy.encode(1, BASE, BASE + "x\n", force_checkpoint=True)[0] is None
+
+
+def test_every_kept_revision_is_rebuilt_from_the_nearest_checkpoint():
+    texts = _history(BASE, 60)
+    policy = RevisionPolicy(checkpoint_interval=7, checkpoint_ratio=0.5, history_limit=20)
+    rows = _store(policy, BASE, texts)
+
+    assert len(rows) >= 20 and max(rows) == 60
+    assert min(rows) > 1 and rows[min(rows)][1] is not None  # pruned history starts at a checkpoint
+    for revision in rows:
+        assert _rebuild(rows, BASE, revision) == texts[revision - 1]
+
+
+def test_record_revision_replays_through_pruned_history(monkeypatch):
+    monkeypatch.setattr('document_edits.revision_policy', RevisionPolicy(checkpoint_interval=4, history_limit=6))
+    texts = _history(BASE, 15, seed=11)
+    with app.app_context():
+        document = GeneratedDocument(document_type='Leave Application', category='general', sender_name='Asha',
+                                     recipient_name='The Principal', purpose='leave', generated_content=BASE)
+        db.session.add(document)
+        db.session.commit()
+        for text in texts:
+            record_revision(document, text)
+
+        assert revision_content(document, 0) == BASE
+        assert revision_content(document, 15) == texts[-1] == document.final_content
+        assert revision_content(document, 10) == texts[9]
+        assert revision_content(document, 2) is None  # dropped beyond the history limit
@@ -0,0 +1,21 @@
+from main import app
+
+ROUTES_RULES = ['/', '/generate', '/generate_stream', '/jobs', '/jobs/<job_id>', '/batch', '/batch/<batch_id>',
+                '/batch/<batch_id>/download', '/download-pdf', '/download_pdf/<int:document_id>', '/export',
+                '/stats/popular', '/history', '/search', '/catalog.json', '/documents/<int:document_id>/improve',
+                '/documents/<int:document_id>/content', '/documents/<int:document_id>/revisions']
+
+
+def test_main_serves_the_routes_module():
+    rules = {rule.rule: rule.endpoint for rule in app.url_map.iter_rules()}
+
+    missing = [rule for rule in ROUTES_RULES if rule not in rules]
+    assert missing == []
+    assert {app.view_functions[rules[rule]].__module__ for rule in ROUTES_RULES} == {'routes'}
+
+
+def test_history_answers_json_even_for_browsers():
+    response = app.test_client().get('/history', headers={'Accept': 'text/html'})
+
+    assert response.status_code == 200
+    assert response.get_json() == {'documents': [], 'next_cursor': None}
@@ -0,0 +1,66 @@
+import uuid
+
+import pytest
+
+from app import app, db
+from models import GeneratedDocument
+from search_service import ensure_search_index, search_documents
+
+
+@pytest.fixture
+def session_id():
+    with app.app_context():
+        ensure_search_index()
+        ensure_search_index()  # idempotent
+        yield str(uuid.uuid4())
+
+
+def _add(session_id, content, sender_name='Asha Patil', purpose='leave'):
+    document = GeneratedDocument(document_type='Leave Application', category='general', sender_name=sender_name,
+                                 recipient_name='The Principal', purpose=purpose, generated_content=content,
+                                 session_id=session_id)
+    db.session.add(document)
+    db.session.commit()
+    return document
+
+
+def _ids(results):
+    return [document.id for document, _ in results]
+
+
+def test_fts5_ranks_matches_within_the_session(session_id):
+    strong = _add(session_id, "Medical leave for fever. The fever lasted three days.")
+    weak = _add(session_id, "Leave request for a family function; no fever mentioned until now.")
+    _add(session_id, "Scholarship renewal request.")
+    other_session = _add(str(uuid.uuid4()), "Fever leave for another student.")
+
+    results = search_documents("fever", session_id=session_id)
+
+    assert _ids(results) == [strong.id, weak.id]
+    assert results[0][1] >= results[1][1]
+    assert other_session.id in _ids(search_documents("fever"))
+
+
+def test_fts5_follows_edits_and_deletes(session_id):
+    document = _add(session_id, "Original text about a library card.")
+    document.edited_content = "Edited text about a hostel room."
+    db.session.commit()
+    assert _ids(search_documents("hostel", session_id=session_id)) == [document.id]
+
+    db.session.delete(document)
+    db.session.commit()
+    assert search_documents("hostel", session_id=session_id) == []
+
+
+def test_fts5_matches_devanagari_words_with_vowel_signs(session_id):
+    document = _add(session_id, "मुझे तीन दिनों की छुट्टी चाहिए।", sender_name='आशा पाटील')
+
+    assert _ids(search_documents("छुट्टी", session_id=session_id)) == [document.id]
+    assert _ids(search_documents("पाटील", session_id=session_id)) == [document.id]
+
+
+def test_fts5_treats_operators_in_queries_as_text(session_id):
+    document = _add(session_id, "Please consider my request NEAR the end of term.")
+
+    assert _ids(search_documents('NEAR("term" *', session_id=session_id)) == [document.id]
+    assert search_documents('"" ---', session_id=session_id) == []
@@ -0,0 +1,118 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+from app import app
+from singleflight import SingleFlight, flight_key
+
+
+def _key():
+    return flight_key('test', {'request': str(uuid.uuid4())})
+
+
+def _in_thread(target, *args, context=True):
+    results = []
+
+    def run():
+        try:
+            if context:
+                with app.app_context():
+                    results.append(target(*args))
+            else:
+                results.append(target(*args))
+        except Exception as e:
+            results.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, results
+
+
+def test_local_followers_share_the_leaders_result():
+    flight, key = SingleFlight(), _key()
+    release, calls = threading.Event(), []
+
+    def generate():
+        calls.append(1)
+        release.wait(5)
+        return 'letter'
+
+    leader, leader_result = _in_thread(flight.do, key, generate, context=False)
+    while flight.stats()['in_flight'] == 0:
+        time.sleep(0.01)
+    follower, follower_result = _in_thread(flight.do, key, generate, context=False)
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert leader_result == follower_result == ['letter']
+    assert len(calls) == 1 and flight.stats()['local_shared'] == 1
+
+
+def test_local_followers_get_the_leaders_error():
+    flight, key = SingleFlight(), _key()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError('upstream failed')
+
+    leader, leader_result = _in_thread(flight.do, key, fail, context=False)
+    while flight.stats()['in_flight'] == 0:
+        time.sleep(0.01)
+    follower, follower_result = _in_thread(flight.do, key, fail, context=False)
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert isinstance(leader_result[0], ValueError) and follower_result[0] is leader_result[0]
+
+
+def test_other_workers_wait_for_the_published_result():
+    # Two instances stand in for two worker processes sharing the generation_locks table
+    worker_a, worker_b = SingleFlight(poll_interval=0.01), SingleFlight(poll_interval=0.01)
+    key = _key()
+    release, calls = threading.Event(), []
+
+    def generate():
+        calls.append(1)
+        release.wait(5)
+        return {'document_id': 7}
+
+    leader, leader_result = _in_thread(worker_a.do, key, generate)
+    while worker_a.stats()['leaders'] == 0:
+        time.sleep(0.01)
+    follower, follower_result = _in_thread(worker_b.do, key, generate)
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert leader_result == follower_result == [{'document_id': 7}]
+    assert len(calls) == 1 and worker_b.stats()['remote_shared'] == 1
+
+    # A late duplicate within the result TTL reuses the published result too
+    with app.app_context():
+        assert worker_b.do(key, generate) == {'document_id': 7}
+    assert len(calls) == 1
+
+
+def test_expired_lock_of_a_dead_worker_is_taken_over():
+    crashed, worker = SingleFlight(lock_ttl=0.2), SingleFlight(poll_interval=0.01)
+    key = _key()
+    with app.app_context():
+        assert crashed._acquire(key, owner='crashed-worker')
+        started = time.monotonic()
+        assert worker.do(key, lambda: 'regenerated') == 'regenerated'
+
+    assert time.monotonic() - started >= 0.1
+    assert worker.stats()['leaders'] == 1
+
+
+@pytest.mark.parametrize('value', [{'b': 1, 'a': 2}, {'a': 2, 'b': 1}])
+def test_flight_keys_ignore_dict_order(value):
+    assert flight_key('document', value) == flight_key('document', {'a': 2, 'b': 1})
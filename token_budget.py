@@ -0,0 +1,132 @@
+import os
+import math
+import time
+import logging
+import threading
+
+from flask import has_app_context
+
+from catalog import catalog
+
+# Starting budgets per category, before any history exists
+CATEGORY_BUDGETS = {
+    'academic': 900,
+    'corporate': 1100,
+    'government': 900,
+    'legal': 1800,
+    'general': 800
+}
+TOKENS_PER_FIELD = 60
+
+# Devanagari text takes more tokens per character than English
+CHARS_PER_TOKEN = {
+    'english': 4.0,
+    'hindi': 2.5,
+    'marathi': 2.3
+}
+LANGUAGE_FACTORS = {
+    'english': 1.0,
+    'hindi': 1.6,
+    'marathi': 1.7
+}
+
+TOKEN_BUDGET_MIN = int(os.environ.get("TOKEN_BUDGET_MIN", "400"))
+TOKEN_BUDGET_MAX = int(os.environ.get("TOKEN_BUDGET_MAX", "4000"))
+TOKEN_BUDGET_MARGIN = float(os.environ.get("TOKEN_BUDGET_MARGIN", "0.25"))
+TOKEN_BUDGET_PERCENTILE = float(os.environ.get("TOKEN_BUDGET_PERCENTILE", "0.95"))
+TOKEN_BUDGET_MIN_SAMPLES = int(os.environ.get("TOKEN_BUDGET_MIN_SAMPLES", "20"))
+TOKEN_BUDGET_REFRESH = float(os.environ.get("TOKEN_BUDGET_REFRESH", "600"))
+
+
+def estimate_tokens(text_length, language):
+    return text_length / CHARS_PER_TOKEN.get(language, CHARS_PER_TOKEN['english'])
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+class TokenBudget:
+    """
+    max_tokens per (document type, language): a catalog-based prior until enough history exists,
+    then the p95 observed output length plus a safety margin
+
+    Budgets are rounded up to a multiple of 100 so they (and completion cache keys) stay stable
+    between refreshes.
+    """
+
+    def __init__(self, minimum=TOKEN_BUDGET_MIN, maximum=TOKEN_BUDGET_MAX, margin=TOKEN_BUDGET_MARGIN,
+                 percentile=TOKEN_BUDGET_PERCENTILE, min_samples=TOKEN_BUDGET_MIN_SAMPLES,
+                 refresh_interval=TOKEN_BUDGET_REFRESH, sample_size=200):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.margin = margin
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.refresh_interval = refresh_interval
+        self.sample_size = sample_size
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def _clamp(self, tokens):
+        tokens = int(math.ceil(tokens / 100.0) * 100)
+        return max(self.minimum, min(self.maximum, tokens))
+
+    def prior(self, document_type, language):
+        """Budget from catalog metadata alone"""
+        info = catalog.get(document_type) or {}
+        base = CATEGORY_BUDGETS.get(info.get('category'), CATEGORY_BUDGETS['general'])
+        base += TOKENS_PER_FIELD * len(info.get('fields', []))
+        return self._clamp(base * LANGUAGE_FACTORS.get(language, 1.0))
+
+    def _observed_lengths(self, document_type, language):
+        # Imported lazily: models imports app, which imports the generators using this module
+        from app import db
+        from models import GeneratedDocument
+
+        rows = (db.session.query(db.func.length(GeneratedDocument.generated_content))
+                .filter(GeneratedDocument.document_type == document_type,
+                        GeneratedDocument.language == language,
+                        GeneratedDocument.is_demo.is_(False))
+                .order_by(GeneratedDocument.created_at.desc())
+                .limit(self.sample_size)
+                .all())
+        return [row[0] for row in rows if row[0]]
+
+    def _tuned(self, document_type, language):
+        lengths = self._observed_lengths(document_type, language)
+        if len(lengths) < self.min_samples:
+            return None
+        tokens = estimate_tokens(percentile(lengths, self.percentile), language)
+        return self._clamp(tokens * (1 + self.margin))
+
+    def max_tokens(self, document_type, language):
+        """Budget for one generation; history is re-read at most once per refresh interval"""
+        language = language or 'english'
+        key = (document_type, language)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._budgets.get(key)
+        if cached is not None and now - cached[1] < self.refresh_interval:
+            return cached[0]
+
+        budget = cached[0] if cached is not None else self.prior(document_type, language)
+        if has_app_context():
+            try:
+                budget = self._tuned(document_type, language) or self.prior(document_type, language)
+            except Exception as e:
+                logging.warning(f"Token budget lookup failed for {document_type}: {str(e)}")
+            with self._lock:
+                self._budgets[key] = (budget, now)
+        return budget
+
+    def snapshot(self):
+        with self._lock:
+            return {f"{document_type}|{language}": budget
+                    for (document_type, language), (budget, _) in self._budgets.items()}
+
+
+token_budget = TokenBudget()
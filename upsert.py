@@ -0,0 +1,11 @@
+def dialect_insert(dialect_name):
+    """
+    Return the INSERT construct supporting ON CONFLICT for this dialect, or None if unsupported
+    """
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None